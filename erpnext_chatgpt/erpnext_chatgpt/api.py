@@ -1,17 +1,121 @@
 import frappe
+import hashlib
 import logging
+import operator
+import time
 from frappe import _
-import json
+import orjson
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import SimpleNamespace
 from typing import List, Dict, Any
-from erpnext_chatgpt.erpnext_chatgpt.tools import get_tools, available_functions
+from openai import OpenAI
+from werkzeug.wrappers import Response
+from erpnext_chatgpt.erpnext_chatgpt.tools import get_tools, get_tools_json, available_functions_raw, build_gl_entries_query, build_document_export_query, EXPORT_DATE_FIELDS, json_serial, ORJSON_OPTIONS
 
 # Initialize module-level logger with aiassistant namespace
 logger = frappe.logger("aiassistant", allow_site=True)
 logger.setLevel(logging.DEBUG)
 
+# Process-wide OpenAI client, keyed by the API key it was built with
+_client_cache = {"key": None, "client": None}
+
+# Formatted system instructions are cached per user for this many seconds
+SYSTEM_INSTRUCTIONS_TTL = 600
+SYSTEM_INSTRUCTIONS_CACHE_KEY = "openai_system_instructions"
+# Stands in for {current_datetime} in the cached instructions
+CURRENT_DATETIME_MARKER = "\x00current_datetime\x00"
+
+# Used by compact_prompt_text to squeeze whitespace out of the instructions
+_INLINE_SPACE_RE = re.compile(r"(?<=\S)[ \t]{2,}")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+# Memoized (model, max_tokens) per site: {site: (expires_at, version, value)}
+# The version lives in Redis, so saving the settings invalidates every worker's copy at once
+MODEL_SETTINGS_TTL = 60
+MODEL_SETTINGS_VERSION_KEY = "openai_model_settings:version"
+_model_settings_cache = {}
+
+# Fraction of the token limit dropped at a time when trimming history
+TRIM_STEP_RATIO = 0.25
+
+# Upper bound on tool calls from one response that run concurrently
+MAX_PARALLEL_TOOL_CALLS = 8
+
+# Seconds to cache the model list returned by /v1/models
+AVAILABLE_MODELS_TTL = 3600
+
+# Model ids containing any of these are offered as chat models (this also covers fine-tuned
+# "ft:gpt-4..." and aliases such as "chatgpt-4o-latest")
+CHAT_MODEL_MARKERS = ("gpt-3.5", "gpt-4")
+
+# Stored conversations: the client sends only the new question and the history is kept server-side
+CONVERSATION_DOCTYPE = "Chat Conversation"
+CONVERSATION_TITLE_LENGTH = 140
+
+# Semantic cache for opening questions: answers are reused when a new question's embedding
+# is at least SEMANTIC_CACHE_THRESHOLD cosine-similar to a cached one from the same user and model
+# and both name the same numbers, documents, names and dates (see get_question_signature).
+# Answers are built from live ERP data, so they are kept only briefly.
+SEMANTIC_CACHE_KEY = "openai_semantic_cache:v2"
+SEMANTIC_CACHE_EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+SEMANTIC_CACHE_TTL = 600
+SEMANTIC_CACHE_MAX_ENTRIES = 100
+
+# Words that pick a period, which embeddings barely tell apart ("sales for March" / "for April")
+SEMANTIC_CACHE_DATE_WORDS = frozenset({
+    "january", "february", "march", "april", "may", "june", "july", "august", "september",
+    "october", "november", "december", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep",
+    "sept", "oct", "nov", "dec", "today", "yesterday", "tomorrow", "this", "last", "next",
+    "previous", "current", "week", "month", "quarter", "year", "ytd", "mtd",
+})
+
+# NDJSON export: lines buffered ahead of the client, and how long to wait for it to read
+NDJSON_QUEUE_SIZE = 1000
+NDJSON_CLIENT_TIMEOUT = 60
+
+# Result list keys returned by the tools, mapped to the label used in tool usage summaries
+RESULT_LIST_LABELS = {
+    "sales_invoices": "sales invoices",
+    "delivery_notes": "delivery notes",
+    "invoices": "invoices",
+    "sales_orders": "sales orders",
+    "quotations": "quotations",
+    "customers": "customers",
+    "employees": "employees",
+    "purchase_orders": "purchase orders",
+    "purchase_invoices": "purchase invoices",
+    "stock_levels": "stock levels",
+    "gl_entries": "ledger entries",
+    "journal_entries": "journal entries",
+    "payments": "payments",
+    "totals": "totals",
+}
+
 def get_system_instructions():
     """Get system instructions with current date and user context."""
-    current_user = frappe.session.user
+    # The user-specific part is cached; only the date is filled in per call. It is the date
+    # alone, not the time, so the system message (the start of every prompt) stays the same
+    # all day and OpenAI's prompt cache can reuse it across turns.
+    return get_cached_system_instructions(frappe.session.user).replace(
+        CURRENT_DATETIME_MARKER, frappe.utils.nowdate()
+    )
+
+def get_cached_system_instructions(current_user):
+    """
+    Get the system instructions formatted for the given user, with
+    CURRENT_DATETIME_MARKER in place of the current date.
+    Results are cached per user for SYSTEM_INSTRUCTIONS_TTL seconds.
+    """
+    cache_key = f"{SYSTEM_INSTRUCTIONS_CACHE_KEY}:{current_user}"
+    cached = frappe.cache().get_value(cache_key)
+    if cached is not None:
+        return cached
+
     user_full_name = frappe.get_value("User", current_user, "full_name") or current_user
     user_roles = frappe.get_roles(current_user)
     company = frappe.defaults.get_user_default("company") or frappe.defaults.get_global_default("company")
@@ -21,27 +125,53 @@ def get_system_instructions():
 
     # If no custom instructions are set, tell the user to configure them
     if not custom_instructions or custom_instructions.strip() == "":
-        return "No system instructions are currently configured. Please go to the OpenAI Settings page to set up custom system instructions for the AI assistant."
-
-    # Replace placeholders with actual values
-    try:
-        system_instructions = custom_instructions.format(
-            user_name=user_full_name,
-            user_email=current_user,
-            user_roles=', '.join(user_roles) if user_roles else 'No roles assigned',
-            company=company if company else 'Not set',
-            current_datetime=frappe.utils.now()
-        )
-    except KeyError as e:
-        # Handle case where placeholder is used incorrectly
-        logger.warning(f"Invalid placeholder in system instructions: {e}")
-        # Return instructions without replacement if there's an error
-        system_instructions = custom_instructions
+        system_instructions = "No system instructions are currently configured. Please go to the OpenAI Settings page to set up custom system instructions for the AI assistant."
+    else:
+        # Replace placeholders with actual values
+        try:
+            system_instructions = custom_instructions.format(
+                user_name=user_full_name,
+                user_email=current_user,
+                user_roles=', '.join(user_roles) if user_roles else 'No roles assigned',
+                company=company if company else 'Not set',
+                current_datetime=CURRENT_DATETIME_MARKER
+            )
+        except KeyError as e:
+            # Handle case where placeholder is used incorrectly
+            logger.warning("Invalid placeholder in system instructions: %s", e)
+            # Return instructions without replacement if there's an error
+            system_instructions = custom_instructions
+        system_instructions = compact_prompt_text(system_instructions)
 
+    frappe.cache().set_value(cache_key, system_instructions, expires_in_sec=SYSTEM_INSTRUCTIONS_TTL)
     return system_instructions
 
+def compact_prompt_text(text):
+    """
+    Strip whitespace that costs input tokens without changing the meaning:
+    trailing spaces, runs of spaces and tabs, and more than one blank line.
+    Leading indentation is kept so markdown lists still nest.
+    """
+    lines = [_INLINE_SPACE_RE.sub(" ", line.rstrip()) for line in text.strip().splitlines()]
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines))
+
+def clear_system_instructions_cache():
+    """Forget the cached system instructions for all users."""
+    frappe.cache().delete_keys(SYSTEM_INSTRUCTIONS_CACHE_KEY)
+
 def get_model_settings():
-    """Get model and max_tokens from settings."""
+    """
+    Get model and max_tokens from settings.
+    Results are memoized per site for MODEL_SETTINGS_TTL seconds to avoid
+    hitting the settings table on every request, and dropped early when the
+    settings version in Redis changes.
+    """
+    site = frappe.local.site
+    version = get_model_settings_version()
+    cached = _model_settings_cache.get(site)
+    if cached and cached[0] > time.monotonic() and cached[1] == version:
+        return cached[2]
+
     model = frappe.db.get_single_value("OpenAI Settings", "model")
     max_tokens = frappe.db.get_single_value("OpenAI Settings", "max_tokens")
 
@@ -51,182 +181,494 @@ def get_model_settings():
     if not max_tokens:
         max_tokens = 8000
 
+    _model_settings_cache[site] = (time.monotonic() + MODEL_SETTINGS_TTL, version, (model, max_tokens))
     return model, max_tokens
 
+def get_model_settings_version():
+    """Get the site's model settings generation, creating one if there is none yet."""
+    version = frappe.cache().get_value(MODEL_SETTINGS_VERSION_KEY)
+    if version is None:
+        version = frappe.generate_hash(length=8)
+        frappe.cache().set_value(MODEL_SETTINGS_VERSION_KEY, version)
+    return version
+
+def clear_model_settings_cache():
+    """Forget the memoized model settings on every worker of the current site."""
+    frappe.cache().delete_value(MODEL_SETTINGS_VERSION_KEY)
+    _model_settings_cache.pop(frappe.local.site, None)
+
 def get_openai_client():
-    """Get the OpenAI client with the API key from settings."""
+    """
+    Get the OpenAI client with the API key from settings.
+    The client is cached per API key so its underlying httpx connection pool
+    (and the TLS sessions in it) is reused across requests.
+    """
     api_key = frappe.db.get_single_value("OpenAI Settings", "api_key")
     if not api_key:
         frappe.throw(_("OpenAI API key is not set in OpenAI Settings."))
 
-    # Import OpenAI
-    from openai import OpenAI
+    if _client_cache["key"] == api_key and _client_cache["client"] is not None:
+        return _client_cache["client"]
+
+    client = build_openai_client(api_key)
+    _client_cache["key"] = api_key
+    _client_cache["client"] = client
+    return client
 
+def build_openai_client(api_key: str):
+    """Create a new OpenAI client for the given API key."""
     # Simple initialization - OpenAI SDK v1.x only needs api_key
-    # Don't pass any proxy-related parameters
+    # Don't pass any proxy-related parameters; httpx==0.27.2 handles proxies correctly
     return OpenAI(api_key=api_key)
 
+def clear_openai_client_cache():
+    """Drop the cached OpenAI client so the next call rebuilds it from settings."""
+    _client_cache["key"] = None
+    _client_cache["client"] = None
+
+def clear_settings_caches(doc, method=None):
+    """
+    doc_events handler for OpenAI Settings: forget everything derived from the settings.
+    OpenAI Settings is a custom DocType, so Frappe never loads a controller class for it
+    and the handler is registered in hooks.py instead.
+    """
+    clear_model_settings_cache()
+    clear_openai_client_cache()
+    clear_system_instructions_cache()
+
+def summarize_tool_result(response_data: Any) -> str:
+    """Build a short, human-readable summary of a tool result for the tool usage log."""
+    if isinstance(response_data, list):
+        return f"Retrieved {len(response_data)} items"
+    if not isinstance(response_data, dict):
+        return "Data retrieved"
+
+    list_key = next((key for key in RESULT_LIST_LABELS if key in response_data), None)
+    if list_key is not None:
+        label = RESULT_LIST_LABELS[list_key]
+        actual_count = len(response_data[list_key])
+        limit = response_data.get('limit')
+        total_count = response_data.get('total_count')
+        if limit and total_count and total_count > actual_count:
+            return f"Retrieved {actual_count} of {total_count} {label} (limited)"
+        if response_data.get('truncated'):
+            return f"Retrieved {actual_count} {label} (limited)"
+        return f"Retrieved {actual_count} {label}"
+
+    if 'total_count' in response_data:
+        # Generic fallback for other paginated responses
+        return f"Found {response_data['total_count']} records"
+    return "Data retrieved successfully"
+
+def run_tool_in_site_context(site: str, sites_path: str, user: str, function_to_call, function_args: Dict[str, Any]) -> Any:
+    """
+    Run a tool function in a worker thread.
+    frappe.local is thread-local, so each worker sets up its own site context and DB connection.
+    """
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+        return function_to_call(**function_args)
+    finally:
+        frappe.destroy()
+
 def handle_tool_calls(tool_calls: List[Any], conversation: List[Dict[str, Any]], tool_usage_log: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
     """
     Handle the tool calls by executing the corresponding functions and appending the results to the conversation.
     Also track tool usage for transparency.
+    Independent tool calls from the same response are executed concurrently; results are
+    appended in the original order so every tool_call_id follows its assistant message.
+    Identical calls (same function and arguments) in one response are executed only once.
 
     :param tool_calls: List of tool calls from OpenAI
     :param conversation: Current conversation history
     :param tool_usage_log: List to track tool usage
     :return: Tuple of updated conversation and tool usage log
     """
-    for tool_call in tool_calls:
-        function_name = tool_call.function.name
-        function_to_call = available_functions.get(function_name)
+    # Resolve every call up front into flat (id, name, function, args, job) tuples,
+    # where job indexes the distinct (function, arguments) pairs that actually run
+    functions = available_functions_raw
+    calls = []
+    jobs = {}
+    job_calls = []
+    for tool_call_id, function_name, raw_args in [
+        (tool_call.id, tool_call.function.name, tool_call.function.arguments) for tool_call in tool_calls
+    ]:
+        function_to_call = functions.get(function_name)
         if not function_to_call:
             frappe.log_error(f"Function {function_name} not found.", "OpenAI Tool Error")
             raise ValueError(f"Function {function_name} not found.")
 
-        function_args = json.loads(tool_call.function.arguments)
+        function_args = orjson.loads(raw_args)
+        job_key = (function_name, orjson.dumps(function_args, option=orjson.OPT_SORT_KEYS))
+        job = jobs.get(job_key)
+        if job is None:
+            job = jobs[job_key] = len(job_calls)
+            job_calls.append((function_to_call, function_args))
+        calls.append((tool_call_id, function_name, function_to_call, function_args, job))
 
-        # Log the tool usage
-        tool_usage_entry = {
-            "tool_name": function_name,
-            "parameters": function_args,
-            "timestamp": frappe.utils.now()
-        }
+    executor = None
+    if len(job_calls) > 1:
+        executor = ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_TOOL_CALLS, len(job_calls)))
+        futures = [
+            executor.submit(run_tool_in_site_context, frappe.local.site, frappe.local.sites_path,
+                            frappe.session.user, function_to_call, function_args)
+            for function_to_call, function_args in job_calls
+        ]
+    else:
+        futures = None
+    job_results = {}
 
-        try:
-            function_response = function_to_call(**function_args)
+    try:
+        for tool_call_id, function_name, function_to_call, function_args, job in calls:
+            # Log the tool usage
+            tool_usage_entry = {
+                "tool_name": function_name,
+                "parameters": function_args,
+                "timestamp": frappe.utils.now()
+            }
 
-            # Parse response to get summary info if it's JSON
             try:
-                response_data = json.loads(function_response)
-                if isinstance(response_data, dict):
-                    # Add summary info for better display
-                    # Check for paginated results with limit
-                    limit = response_data.get('limit')
-                    total_count = response_data.get('total_count')
-
-                    # Handle different response types
-                    if 'delivery_notes' in response_data:
-                        actual_count = len(response_data['delivery_notes'])
-                        if limit and total_count and total_count > actual_count:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} of {total_count} delivery notes (limited)"
-                        else:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} delivery notes"
-                    elif 'invoices' in response_data:
-                        actual_count = len(response_data['invoices'])
-                        if limit and total_count and total_count > actual_count:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} of {total_count} invoices (limited)"
-                        else:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} invoices"
-                    elif 'sales_orders' in response_data:
-                        actual_count = len(response_data['sales_orders'])
-                        if limit and total_count and total_count > actual_count:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} of {total_count} sales orders (limited)"
-                        else:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} sales orders"
-                    elif 'quotations' in response_data:
-                        actual_count = len(response_data['quotations'])
-                        if limit and total_count and total_count > actual_count:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} of {total_count} quotations (limited)"
-                        else:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} quotations"
-                    elif 'customers' in response_data:
-                        actual_count = len(response_data['customers'])
-                        if limit and total_count and total_count > actual_count:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} of {total_count} customers (limited)"
-                        else:
-                            tool_usage_entry['result_summary'] = f"Retrieved {actual_count} customers"
-                    elif 'total_count' in response_data:
-                        # Generic fallback for other paginated responses
-                        tool_usage_entry['result_summary'] = f"Found {total_count} records"
-                    elif isinstance(response_data, list):
-                        tool_usage_entry['result_summary'] = f"Retrieved {len(response_data)} items"
-                    else:
-                        tool_usage_entry['result_summary'] = "Data retrieved successfully"
+                if futures is not None:
+                    function_response = futures[job].result()
+                elif job in job_results:
+                    function_response = job_results[job]
+                else:
+                    function_response = job_results[job] = function_to_call(**function_args)
+
+                # Tools return either a JSON string or native Python data; parse or serialize exactly once
+                if isinstance(function_response, str):
+                    content = function_response
+                    try:
+                        response_data = orjson.loads(function_response)
+                    except ValueError:
+                        response_data = None
                 else:
-                    tool_usage_entry['result_summary'] = "Data retrieved"
-            except:
-                tool_usage_entry['result_summary'] = "Query executed"
-
-            tool_usage_entry['status'] = 'success'
-
-        except Exception as e:
-            frappe.log_error(f"Error calling function {function_name} with args {json.dumps(function_args)}: {str(e)}", "OpenAI Tool Error")
-            tool_usage_entry['status'] = 'error'
-            tool_usage_entry['error'] = str(e)
-            raise
-
-        tool_usage_log.append(tool_usage_entry)
-
-        conversation.append({
-            "tool_call_id": tool_call.id,
-            "role": "tool",
-            "name": function_name,
-            "content": str(function_response),
-        })
+                    response_data = function_response
+                    content = orjson.dumps(function_response, default=json_serial, option=ORJSON_OPTIONS).decode()
+
+                # Get summary info for better display
+                try:
+                    tool_usage_entry['result_summary'] = (
+                        summarize_tool_result(response_data) if response_data is not None else "Query executed"
+                    )
+                except Exception:
+                    tool_usage_entry['result_summary'] = "Query executed"
+
+                tool_usage_entry['status'] = 'success'
+
+            except Exception as e:
+                args_repr = orjson.dumps(function_args, default=str).decode()
+                frappe.log_error(f"Error calling function {function_name} with args {args_repr}: {e}", "OpenAI Tool Error")
+                tool_usage_entry['status'] = 'error'
+                tool_usage_entry['error'] = str(e)
+                raise
+
+            tool_usage_log.append(tool_usage_entry)
+
+            conversation.append({
+                "tool_call_id": tool_call_id,
+                "role": "tool",
+                "name": function_name,
+                "content": content,
+            })
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
     return conversation, tool_usage_log
 
-def estimate_token_count(messages: List[Dict[str, Any]]) -> int:
+@lru_cache(maxsize=16)
+def get_token_encoder(model: str = None):
+    """
+    Get the tiktoken encoder for a model, memoized per model name.
+    Returns None when tiktoken (or its encoding data) is unavailable.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown or custom model names fall back to the GPT-4 family encoding
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("Could not load tiktoken encoding for %s: %s", model, e)
+        return None
+
+@lru_cache(maxsize=16)
+def get_tools_token_count(model: str = None) -> int:
+    """
+    Estimate the tokens the tool schemas add to every request.
+    The schemas are static, so they are counted once per model.
+    """
+    tools_json = get_tools_json()
+    encoder = get_token_encoder(model) if model else None
+    if encoder is None:
+        return len(tools_json) >> 2
+    return len(encoder.encode(tools_json.decode(), disallowed_special=()))
+
+def estimate_token_count(messages: List[Dict[str, Any]], model: str = None) -> int:
     """
     Estimate the token count for a list of messages.
-    This is a rough estimation; OpenAI provides more accurate token counting in their own libraries.
+    Uses tiktoken when available, otherwise a rough estimation of about 4 characters per token.
+    The per-message count is cached on the message under "_tok", so repeated calls are cheap.
     """
     tokens_per_message = 4  # Average tokens per message (considering metadata)
-    tokens_per_word = 1.5   # Average tokens per word (this may vary)
+    encoder = get_token_encoder(model) if model else None
 
-    return sum(tokens_per_message + int(len(str(message.get("content", "")).split()) * tokens_per_word)
-               for message in messages if message.get("content") is not None)
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if content is None:
+            continue
+        tokens = message.get("_tok")
+        if tokens is None:
+            if not isinstance(content, str):
+                # Structured content (tool payloads, content parts) is sent as JSON
+                content = orjson.dumps(content, default=json_serial, option=ORJSON_OPTIONS).decode()
+            if encoder is not None:
+                tokens = tokens_per_message + len(encoder.encode(content, disallowed_special=()))
+            else:
+                tokens = tokens_per_message + (len(content) >> 2)
+            message["_tok"] = tokens
+        total += tokens
+    return total
 
-def trim_conversation_to_token_limit(conversation: List[Dict[str, Any]], token_limit: int = None) -> List[Dict[str, Any]]:
+def to_openai_messages(conversation: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Return copies of the messages without internal keys (such as the cached "_tok" count)."""
+    return [{key: value for key, value in message.items() if not key.startswith("_")}
+            for message in conversation]
+
+def trim_conversation_to_token_limit(conversation: List[Dict[str, Any]], token_limit: int = None, model: str = None) -> List[Dict[str, Any]]:
     """
     Trim the conversation so that its total token count does not exceed the specified limit.
-    Keeps the most recent messages and trims older ones.
-    """
-    if token_limit is None:
-        _, token_limit = get_model_settings()
-    while estimate_token_count(conversation) > token_limit and len(conversation) > 1:
-        # Remove the oldest non-system message
-        for i, message in enumerate(conversation):
-            if message.get("role") != "system":
-                del conversation[i]
-                break
+    Keeps the system messages and the most recent messages, dropping older ones.
+
+    History is dropped from the front in steps of TRIM_STEP_RATIO * token_limit tokens, so the
+    cut point stays put for several turns. Together with a system message that changes only with
+    the date (see get_system_instructions), the prompt prefix sent to OpenAI then stays
+    byte-identical from turn to turn, which keeps OpenAI's automatic prompt caching effective.
+    The kept history always starts at a user message, so tool results are never separated
+    from the assistant message that requested them.
+    """
+    if token_limit is None or model is None:
+        settings_model, settings_limit = get_model_settings()
+        token_limit = token_limit if token_limit is not None else settings_limit
+        model = model or settings_model
+
+    sizes = [estimate_token_count([message], model) for message in conversation]
+    if sum(sizes) <= token_limit:
+        return conversation
+
+    system_idxs = [i for i, message in enumerate(conversation) if message.get("role") == "system"]
+    other_idxs = [i for i, message in enumerate(conversation) if message.get("role") != "system"]
+    budget = token_limit - sum(sizes[i] for i in system_idxs)
+
+    # Round the amount to drop up to a whole number of steps
+    step = max(int(token_limit * TRIM_STEP_RATIO), 1)
+    excess = sum(sizes[i] for i in other_idxs) - budget
+    drop_target = -(-excess // step) * step
+
+    cut = 0
+    dropped = 0
+    while cut < len(other_idxs) and dropped < drop_target:
+        dropped += sizes[other_idxs[cut]]
+        cut += 1
+
+    # Start the kept history at a user message, but never drop the latest question
+    user_positions = [pos for pos, i in enumerate(other_idxs) if conversation[i].get("role") == "user"]
+    next_user = next((pos for pos in user_positions if pos >= cut), None)
+    if next_user is not None:
+        cut = next_user
+    elif user_positions:
+        cut = user_positions[-1]
+
+    kept = system_idxs + other_idxs[cut:]
+    conversation[:] = [conversation[i] for i in sorted(kept)]
     return conversation
 
+def prepare_conversation(conversation: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], str, int]:
+    """
+    Add the system instructions if missing and trim the conversation to the configured token limit.
+
+    :return: Tuple of the prepared conversation, the model name and the token limit
+    """
+    # Add system instructions as the initial message if not present
+    if not conversation or conversation[0].get("role") != "system":
+        conversation.insert(0, {"role": "system", "content": get_system_instructions()})
+
+    # Get model settings
+    model, max_tokens = get_model_settings()
+
+    # Trim conversation to stay within the token limit, leaving room for the tool schemas
+    # that are sent with every request
+    message_limit = max(max_tokens - get_tools_token_count(model), 1)
+    conversation = trim_conversation_to_token_limit(conversation, message_limit, model)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Conversation: %s", orjson.dumps(conversation, default=str).decode())
+    return conversation, model, max_tokens
+
+def get_cacheable_question(conversation: List[Dict[str, Any]]) -> str:
+    """
+    Return the question if the semantic cache applies to this conversation, otherwise None.
+    Only opening questions are cached, since later answers depend on the earlier turns.
+    """
+    messages = [message for message in conversation if message.get("role") != "system"]
+    if len(messages) != 1 or messages[0].get("role") != "user" or not isinstance(messages[0].get("content"), str):
+        return None
+    if not frappe.db.get_single_value("OpenAI Settings", "enable_semantic_cache"):
+        return None
+    return messages[0]["content"]
+
+def embed_question(client, question: str) -> List[float]:
+    """Embed a question for the semantic cache; returns None if the embedding call fails."""
+    try:
+        response = client.embeddings.create(model=SEMANTIC_CACHE_EMBEDDING_MODEL, input=question)
+    except Exception as e:
+        logger.warning("Semantic cache embedding failed: %s", e)
+        return None
+    return response.data[0].embedding
+
+def get_question_signature(question: str) -> tuple:
+    """
+    The parts of a question a cached answer must match exactly: words with digits (amounts,
+    dates, document numbers), capitalized words after the first (customer, item and other
+    names) and period words. Similar embeddings alone would let "sales for March" reuse the
+    answer to "sales for April".
+    """
+    words = re.findall(r"[\w./-]+", question)
+    return tuple(sorted({
+        word.lower() for position, word in enumerate(words)
+        if any(char.isdigit() for char in word)
+        or (position and word[:1].isupper())
+        or word.lower() in SEMANTIC_CACHE_DATE_WORDS
+    }))
+
+def get_semantic_cache_key(model: str) -> str:
+    # Scoped per user: answers are built from data the asking user is permitted to read
+    return f"{SEMANTIC_CACHE_KEY}:{frappe.session.user}:{model}"
+
+def lookup_semantic_cache(model: str, question: str, embedding: List[float]) -> Dict[str, Any]:
+    """
+    Find a cached response for a question similar to the embedded one and with the same signature.
+
+    :return: The cached {"content": ..., "tool_usage": [...]} or None
+    """
+    entries = frappe.cache().get_value(get_semantic_cache_key(model)) or []
+    signature = get_question_signature(question)
+    now = time.time()
+    best_score, best_response = SEMANTIC_CACHE_THRESHOLD, None
+    for expires_at, cached_signature, cached_embedding, response in entries:
+        if expires_at < now or cached_signature != signature:
+            continue
+        # OpenAI embeddings are unit length, so the dot product is the cosine similarity
+        score = sum(map(operator.mul, embedding, cached_embedding))
+        if score >= best_score:
+            best_score, best_response = score, response
+    return best_response
+
+def store_semantic_cache(model: str, question: str, embedding: List[float], response: Dict[str, Any]) -> None:
+    """Remember a response for the embedded question, keeping only the newest live entries."""
+    key = get_semantic_cache_key(model)
+    now = time.time()
+    entries = [entry for entry in frappe.cache().get_value(key) or [] if entry[0] >= now]
+    entries.insert(0, (now + SEMANTIC_CACHE_TTL, get_question_signature(question), embedding, response))
+    frappe.cache().set_value(key, entries[:SEMANTIC_CACHE_MAX_ENTRIES], expires_in_sec=SEMANTIC_CACHE_TTL)
+
+def load_conversation(conversation_id: str = None) -> tuple[Any, List[Dict[str, Any]]]:
+    """
+    Load a stored conversation of the current user, or start a new one if no id is given.
+
+    :return: Tuple of the Chat Conversation document and its messages
+    """
+    if not conversation_id:
+        doc = frappe.new_doc(CONVERSATION_DOCTYPE)
+        doc.user = frappe.session.user
+        return doc, []
+
+    doc = frappe.get_doc(CONVERSATION_DOCTYPE, conversation_id)
+    if doc.user != frappe.session.user:
+        frappe.throw(_("Not permitted to access this conversation."), frappe.PermissionError)
+    return doc, orjson.loads(doc.messages) if doc.messages else []
+
+def save_conversation_turn(doc, new_messages: List[Dict[str, Any]]) -> None:
+    """
+    Append messages to a stored conversation and save it.
+    The stored JSON is extended as a string, so earlier turns are not re-serialized.
+    """
+    new_json = orjson.dumps(to_openai_messages(new_messages), default=json_serial, option=ORJSON_OPTIONS).decode()
+    stored = doc.messages.rstrip() if doc.messages else "[]"
+    if stored == "[]":
+        doc.messages = new_json
+    else:
+        doc.messages = stored[:-1] + "," + new_json[1:]
+
+    if not doc.title:
+        doc.title = new_messages[0].get("content", "")[:CONVERSATION_TITLE_LENGTH]
+
+    if doc.is_new():
+        doc.insert(ignore_permissions=True)
+    else:
+        doc.save(ignore_permissions=True)
+
+def json_response(data: Any) -> Response:
+    """
+    Send a whitelisted method's result encoded by orjson, in the {"message": ...} envelope
+    frappe.call expects, instead of letting Frappe encode it with its indented stdlib JSON.
+    """
+    return Response(orjson.dumps({"message": data}, default=json_serial, option=ORJSON_OPTIONS), mimetype="application/json")
+
 @frappe.whitelist()
-def ask_openai_question(conversation: List[Dict[str, Any]]) -> Dict[str, Any]:
+def ask_openai_question(conversation: List[Dict[str, Any]] = None, conversation_id: str = None, message: str = None) -> Response:
     """
     Ask a question to the OpenAI model and handle the response.
     Track all tool usage for transparency.
 
+    Pass either the whole conversation, or just the new message together with the
+    conversation_id returned by an earlier call. In the latter case the history is
+    loaded from and saved to a Chat Conversation document.
+
     :param conversation: List of conversation messages.
-    :return: The response from OpenAI with tool usage information.
+    :param conversation_id: Name of a stored Chat Conversation; omit to start a new one.
+    :param message: The new user question for a stored conversation.
+    :return: The response from OpenAI with tool usage information, as a JSON response.
     """
     try:
+        stored_conversation = None
+        if message is not None:
+            stored_conversation, history = load_conversation(conversation_id)
+            user_message = {"role": "user", "content": message}
+            conversation = history + [user_message]
+
         client = get_openai_client()
         tool_usage_log = []
+        conversation, model, max_tokens = prepare_conversation(conversation)
 
-        # Add system instructions as the initial message if not present
-        if not conversation or conversation[0].get("role") != "system":
-            conversation.insert(0, {"role": "system", "content": get_system_instructions()})
-
-        # Get model settings
-        model, max_tokens = get_model_settings()
-
-        # Trim conversation to stay within the token limit
-        conversation = trim_conversation_to_token_limit(conversation, max_tokens)
-
-        logger.debug(f"Conversation: {json.dumps(conversation)}")
+        question = get_cacheable_question(conversation)
+        question_embedding = embed_question(client, question) if question else None
+        cached = lookup_semantic_cache(model, question, question_embedding) if question_embedding else None
+        if cached:
+            response_data = {"role": "assistant", "content": cached["content"], "tool_usage": cached["tool_usage"]}
+            if stored_conversation is not None:
+                save_conversation_turn(stored_conversation, [user_message, dict(response_data)])
+                response_data['conversation_id'] = stored_conversation.name
+            return json_response(response_data)
 
         tools = get_tools()
         response = client.chat.completions.create(
             model=model,
-            messages=conversation,
+            messages=to_openai_messages(conversation),
             tools=tools,
             tool_choice="auto"
         )
 
         response_message = response.choices[0].message
 
-        logger.debug(f"OpenAI Response: {response_message}")
+        logger.debug("OpenAI Response: %s", response_message)
 
         tool_calls = response_message.tool_calls
         if tool_calls:
@@ -234,25 +676,267 @@ def ask_openai_question(conversation: List[Dict[str, Any]]) -> Dict[str, Any]:
             conversation, tool_usage_log = handle_tool_calls(tool_calls, conversation, tool_usage_log)
 
             # Trim again if needed after tool calls
-            conversation = trim_conversation_to_token_limit(conversation, max_tokens)
+            conversation = trim_conversation_to_token_limit(conversation, max_tokens, model)
 
             second_response = client.chat.completions.create(
                 model=model,
-                messages=conversation
+                messages=to_openai_messages(conversation)
             )
+            response_message = second_response.choices[0].message
 
-            # Return response with tool usage information
-            response_data = second_response.choices[0].message.model_dump()
-            response_data['tool_usage'] = tool_usage_log
-            return response_data
-
-        # Return response with empty tool usage if no tools were called
+        # Return response with tool usage information (empty if no tools were called)
         response_data = response_message.model_dump()
         response_data['tool_usage'] = tool_usage_log
-        return response_data
+
+        if question_embedding:
+            store_semantic_cache(model, question, question_embedding,
+                                 {"content": response_data.get("content"), "tool_usage": tool_usage_log})
+
+        if stored_conversation is not None:
+            save_conversation_turn(stored_conversation, [
+                user_message,
+                {"role": "assistant", "content": response_data.get("content"), "tool_usage": tool_usage_log},
+            ])
+            response_data['conversation_id'] = stored_conversation.name
+        return json_response(response_data)
     except Exception as e:
         frappe.log_error(str(e), "OpenAI API Error")
-        return {"error": str(e), "tool_usage": []}
+        return json_response({"error": str(e), "tool_usage": []})
+
+@frappe.whitelist()
+def ask_openai_question_stream(conversation: List[Dict[str, Any]] = None, conversation_id: str = None, message: str = None) -> Response:
+    """
+    Streaming variant of ask_openai_question.
+    Returns a text/event-stream response whose events are JSON objects:
+    {"delta": "..."} for answer text as it is generated, {"tool_usage": [...]} once tools have run,
+    {"error": "..."} on failure and a final {"done": true, "tool_usage": [...]}.
+    For stored conversations the final event also carries the "conversation_id".
+
+    :param conversation: List of conversation messages.
+    :param conversation_id: Name of a stored Chat Conversation; omit to start a new one.
+    :param message: The new user question for a stored conversation.
+    :return: Server-sent events response.
+    """
+    if isinstance(conversation, str):
+        conversation = orjson.loads(conversation)
+
+    # The response body is produced after this request's Frappe context has been torn down,
+    # so the work runs in its own thread with its own site context and feeds a queue.
+    events = queue.Queue()
+    worker = threading.Thread(
+        target=stream_openai_answer,
+        args=(frappe.local.site, frappe.local.sites_path, frappe.session.user, conversation, events,
+              conversation_id, message),
+        daemon=True
+    )
+    worker.start()
+
+    def generate():
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield b"data: " + orjson.dumps(event, default=json_serial, option=ORJSON_OPTIONS) + b"\n\n"
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_openai_answer(site: str, sites_path: str, user: str, conversation: List[Dict[str, Any]], events: queue.Queue,
+                         conversation_id: str = None, message: str = None) -> None:
+    """
+    Run a streamed chat completion (including any tool calls) and push events onto the queue.
+    Always finishes by putting None on the queue.
+    """
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+
+        stored_conversation = None
+        if message is not None:
+            stored_conversation, history = load_conversation(conversation_id)
+            user_message = {"role": "user", "content": message}
+            conversation = history + [user_message]
+
+        client = get_openai_client()
+        tool_usage_log = []
+        conversation, model, max_tokens = prepare_conversation(conversation)
+
+        question = get_cacheable_question(conversation)
+        question_embedding = embed_question(client, question) if question else None
+        cached = lookup_semantic_cache(model, question, question_embedding) if question_embedding else None
+        if cached:
+            content, tool_calls = cached["content"], None
+            tool_usage_log = cached["tool_usage"]
+            events.put({"delta": content})
+        else:
+            content, tool_calls = stream_completion(client, events, model=model,
+                                                    messages=to_openai_messages(conversation),
+                                                    tools=get_tools(), tool_choice="auto")
+        if tool_calls:
+            conversation.append({
+                "role": "assistant",
+                "content": content or None,
+                "tool_calls": [
+                    {"id": call.id, "type": "function",
+                     "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                    for call in tool_calls
+                ],
+            })
+            conversation, tool_usage_log = handle_tool_calls(tool_calls, conversation, tool_usage_log)
+            events.put({"tool_usage": tool_usage_log})
+
+            # Trim again if needed after tool calls
+            conversation = trim_conversation_to_token_limit(conversation, max_tokens, model)
+            content = stream_completion(client, events, model=model, messages=to_openai_messages(conversation))[0]
+
+        if question_embedding and not cached:
+            store_semantic_cache(model, question, question_embedding, {"content": content, "tool_usage": tool_usage_log})
+
+        done_event = {"done": True, "tool_usage": tool_usage_log}
+        if stored_conversation is not None:
+            save_conversation_turn(stored_conversation, [
+                user_message,
+                {"role": "assistant", "content": content, "tool_usage": tool_usage_log},
+            ])
+            # This thread is not a request, so nothing commits on its behalf
+            frappe.db.commit()
+            done_event["conversation_id"] = stored_conversation.name
+        events.put(done_event)
+    except Exception as e:
+        frappe.log_error(str(e), "OpenAI API Error")
+        events.put({"error": str(e)})
+    finally:
+        events.put(None)
+        frappe.destroy()
+
+@frappe.whitelist()
+def export_gl_entries_ndjson(start_date: str, end_date: str, account: str = None) -> Response:
+    """
+    Stream GL entries as newline-delimited JSON, one entry per line, for ranges too large for
+    the get_general_ledger_entries tool. Rows are read with an unbuffered cursor and written as
+    they arrive, so memory use does not grow with the size of the range.
+
+    :param start_date: First posting date (YYYY-MM-DD)
+    :param end_date: Last posting date (YYYY-MM-DD), inclusive
+    :param account: Optional account to filter by
+    :return: application/x-ndjson response
+    """
+    frappe.has_permission("GL Entry", "read", throw=True)
+    if not start_date or not end_date:
+        frappe.throw(_("start_date and end_date are required"))
+
+    query, values = build_gl_entries_query(start_date, end_date, account)
+    return ndjson_response(query, values)
+
+@frappe.whitelist()
+def export_documents_ndjson(doctype: str, start_date: str, end_date: str) -> Response:
+    """
+    Stream the documents of one of the EXPORT_DATE_FIELDS DocTypes in a date range as
+    newline-delimited JSON, with the same columns as the matching tool, for ranges too large
+    for the tools' row limit.
+
+    :param doctype: DocType to export, e.g. "Sales Invoice"
+    :param start_date: First date (YYYY-MM-DD)
+    :param end_date: Last date (YYYY-MM-DD), inclusive
+    :return: application/x-ndjson response
+    """
+    if doctype not in EXPORT_DATE_FIELDS:
+        frappe.throw(_("Exporting {0} is not supported").format(doctype))
+    frappe.has_permission(doctype, "read", throw=True)
+    if not start_date or not end_date:
+        frappe.throw(_("start_date and end_date are required"))
+
+    query, values = build_document_export_query(doctype, start_date, end_date)
+    return ndjson_response(query, values)
+
+def ndjson_response(query: str, values: Dict[str, Any]) -> Response:
+    """
+    Stream the rows of a query as newline-delimited JSON. Rows are read with an unbuffered
+    cursor and written as they arrive, so memory use does not grow with the size of the result.
+    """
+    # As with streamed answers, the rows are read in a thread with its own site context;
+    # the bounded queue keeps the reader at most NDJSON_QUEUE_SIZE lines ahead of the client
+    lines = queue.Queue(maxsize=NDJSON_QUEUE_SIZE)
+    worker = threading.Thread(
+        target=stream_query_rows,
+        args=(frappe.local.site, frappe.local.sites_path, frappe.session.user, query, values, lines),
+        daemon=True
+    )
+    worker.start()
+
+    def generate():
+        while True:
+            line = lines.get()
+            if line is None:
+                break
+            yield line
+
+    return Response(
+        generate(),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        direct_passthrough=True
+    )
+
+def stream_query_rows(site: str, sites_path: str, user: str, query: str, values: Dict[str, Any], lines: queue.Queue) -> None:
+    """
+    Read the rows of a query with an unbuffered cursor and push them onto the queue as NDJSON lines.
+    Always finishes by putting None on the queue, unless the client has stopped reading.
+    """
+    frappe.init(site=site, sites_path=sites_path)
+    try:
+        frappe.connect()
+        frappe.set_user(user)
+
+        with frappe.db.unbuffered_cursor():
+            for row in frappe.db.sql(query, values, as_dict=True, as_iterator=True):
+                lines.put(orjson.dumps(row, default=json_serial, option=ORJSON_OPTIONS) + b"\n", timeout=NDJSON_CLIENT_TIMEOUT)
+        lines.put(None, timeout=NDJSON_CLIENT_TIMEOUT)
+    except queue.Full:
+        logger.warning("NDJSON export abandoned: client stopped reading")
+    except Exception as e:
+        frappe.log_error(str(e), "NDJSON Export Failed")
+        try:
+            lines.put(orjson.dumps({"error": str(e)}) + b"\n", timeout=NDJSON_CLIENT_TIMEOUT)
+            lines.put(None, timeout=NDJSON_CLIENT_TIMEOUT)
+        except queue.Full:
+            pass
+    finally:
+        frappe.destroy()
+
+def stream_completion(client, events: queue.Queue, **kwargs) -> tuple[str, List[Any]]:
+    """
+    Create a streamed chat completion, forwarding content deltas to the queue as they arrive.
+
+    :return: Tuple of the full content and the tool calls assembled from the stream
+    """
+    content_parts = []
+    tool_call_parts = {}
+    for chunk in client.chat.completions.create(stream=True, **kwargs):
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            events.put({"delta": delta.content})
+        for tool_call in delta.tool_calls or []:
+            # Tool calls arrive in fragments keyed by their index
+            part = tool_call_parts.setdefault(tool_call.index, {"id": "", "name": "", "arguments": ""})
+            if tool_call.id:
+                part["id"] = tool_call.id
+            if tool_call.function:
+                part["name"] += tool_call.function.name or ""
+                part["arguments"] += tool_call.function.arguments or ""
+
+    tool_calls = [
+        SimpleNamespace(id=part["id"], function=SimpleNamespace(name=part["name"], arguments=part["arguments"]))
+        for _index, part in sorted(tool_call_parts.items())
+    ]
+    return "".join(content_parts), tool_calls
 
 @frappe.whitelist()
 def test_openai_api_key(api_key: str) -> bool:
@@ -263,14 +947,11 @@ def test_openai_api_key(api_key: str) -> bool:
     :return: True if the API key is valid, False otherwise.
     """
     try:
-        # Import OpenAI
-        from openai import OpenAI
-
-        # Simple client creation with just the API key
-        # httpx==0.27.2 handles proxies correctly
-        client = OpenAI(api_key=api_key)
+        client = build_openai_client(api_key)
         # Test the key by listing models
         list(client.models.list())
+        # The key may have just been rotated; make sure the cached client is rebuilt
+        clear_openai_client_cache()
         return True
     except Exception as e:
         frappe.log_error(str(e), "OpenAI API Key Test Failed")
@@ -281,23 +962,35 @@ def get_available_models() -> List[str]:
     """
     Get list of available OpenAI models for the current API key.
 
+    The list is cached per API key for AVAILABLE_MODELS_TTL seconds.
+
     :return: List of model IDs that can be used for chat completions
     """
+    cache_key = None
     try:
+        # Key the cache on a hash of the API key so rotating the key refreshes the list
+        api_key = frappe.db.get_single_value("OpenAI Settings", "api_key") or ""
+        cache_key = f"openai_available_models:{hashlib.sha256(api_key.encode()).hexdigest()[:16]}"
+        chat_models = frappe.cache().get_value(cache_key)
+        if chat_models:
+            return chat_models
+
         client = get_openai_client()
         models = list(client.models.list())
 
-        # Filter for chat models
-        chat_models = []
-        for model in models:
-            if any(prefix in model.id for prefix in ["gpt-3.5", "gpt-4"]):
-                chat_models.append(model.id)
-
-        # Sort models for better display
-        chat_models.sort()
+        # Filter for chat models, sorted for better display
+        chat_models = sorted(
+            model.id for model in models if any(marker in model.id for marker in CHAT_MODEL_MARKERS)
+        )
+        frappe.cache().set_value(cache_key, chat_models, expires_in_sec=AVAILABLE_MODELS_TTL)
+        # Keep the last good list without expiry as a fallback for API errors
+        frappe.cache().set_value(f"{cache_key}:last", chat_models)
         return chat_models
     except Exception as e:
         frappe.log_error(str(e), "Failed to fetch available models")
+        last_known = frappe.cache().get_value(f"{cache_key}:last") if cache_key else None
+        if last_known:
+            return last_known
         # Return default models if API call fails
         return ["gpt-3.5-turbo", "gpt-3.5-turbo-16k", "gpt-4", "gpt-4-turbo", "gpt-4o", "gpt-4o-mini"]
 
@@ -314,12 +1007,7 @@ def test_connection() -> Dict[str, Any]:
         if not api_key:
             return {"success": False, "message": _("OpenAI API key is not set. Please enter an API key first.")}
 
-        # Import OpenAI
-        from openai import OpenAI
-
-        # Simple initialization with just API key
-        # httpx==0.27.2 handles proxies correctly
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client()
 
         # Test the connection by listing models
         models = list(client.models.list())
@@ -1,72 +1,600 @@
 import frappe
+import hashlib
 import logging
-import json
-from datetime import datetime, date, timedelta
+import orjson
+from datetime import timedelta
 from decimal import Decimal
+from functools import wraps
+from frappe.desk.query_report import run as run_report
+from frappe.query_builder import DocType
+from frappe.utils import add_days, cint, flt, getdate
 
 # Initialize module-level logger with aiassistant namespace
 logger = frappe.logger("aiassistant", allow_site=True)
 logger.setLevel(logging.DEBUG)
 
+# Rows returned by one tool call when no limit is requested, and the hard cap on any
+# requested limit. The cap can be changed per site with the "erpnext_chatgpt_max_rows" config key.
+DEFAULT_ROW_LIMIT = 100
+MAX_ROWS = 500
+
+# Seconds a memoized tool result is reused for the same user and arguments
+TOOL_CACHE_TTL = 60
+TOOL_CACHE_KEY = "erpnext_chatgpt_tool"
+
+# Seconds the chat dispatcher reuses a date-window report for the same user and arguments,
+# which covers the model repeating a call on a retry or a follow-up question
+DISPATCH_CACHE_TTL = 30
+
+# Memoized tools whose cached results are dropped when a document of the DocType changes.
+# "totals:<DocType>" stands for the list totals of that DocType (see get_cached_totals).
+# Payments settle invoices, and invoices and deliveries update their orders' billed and
+# delivered percentages, without saving those documents, so they invalidate them too.
+# hooks.py registers clear_tool_cache for each of these DocTypes.
+CACHED_TOOL_DOCTYPES = {
+    "Employee": ("get_employees",),
+    "Customer": ("get_customers", "list_customers"),
+    "Bin": ("get_stock_levels",),
+    "Sales Invoice": (
+        "get_outstanding_invoices", "totals:Sales Invoice", "totals:Sales Order", "totals:Delivery Note",
+    ),
+    "Purchase Invoice": ("totals:Purchase Invoice",),
+    "Payment Entry": ("get_outstanding_invoices", "totals:Sales Invoice", "totals:Purchase Invoice"),
+    "Journal Entry": ("get_outstanding_invoices", "totals:Sales Invoice", "totals:Purchase Invoice"),
+    "Quotation": ("list_quotations", "totals:Quotation"),
+    "Sales Order": ("totals:Sales Order",),
+    "Delivery Note": ("totals:Delivery Note", "totals:Sales Order"),
+}
+
+# Columns returned per DocType. Selecting only what the assistant reasons about keeps rows
+# narrow from the database through to the JSON sent to the model.
+# Tuples, because frappe.db.get_all rewrites the fields list it is given; pass list(...).
+FIELDS = {
+    "Sales Invoice": (
+        "name", "customer", "customer_name", "posting_date", "due_date", "currency",
+        "grand_total", "outstanding_amount", "status", "is_return",
+    ),
+    "Sales Invoice Detail": (
+        "name", "customer", "customer_name", "company", "posting_date", "due_date", "currency",
+        "net_total", "total_taxes_and_charges", "discount_amount", "grand_total",
+        "outstanding_amount", "paid_amount", "status", "is_return", "po_no", "territory",
+        "remarks", "docstatus",
+    ),
+    "Sales Invoice Item": (
+        "item_code", "item_name", "description", "qty", "uom", "rate", "discount_percentage",
+        "amount", "warehouse", "sales_order", "delivery_note",
+    ),
+    "Sales Taxes and Charges": (
+        "charge_type", "account_head", "description", "rate", "tax_amount", "total",
+    ),
+    "Employee": (
+        "name", "employee_name", "department", "designation", "branch", "company",
+        "status", "date_of_joining", "reports_to", "user_id",
+    ),
+    "Purchase Order": (
+        "name", "supplier", "supplier_name", "transaction_date", "schedule_date", "currency",
+        "grand_total", "status", "per_received", "per_billed",
+    ),
+    "Customer": (
+        "name", "customer_name", "customer_type", "customer_group", "territory",
+        "default_currency", "email_id", "mobile_no", "disabled",
+    ),
+    "GL Entry": (
+        "name", "posting_date", "account", "party_type", "party", "debit", "credit",
+        "account_currency", "voucher_type", "voucher_no", "against", "cost_center", "remarks",
+        "is_cancelled",
+    ),
+    "Sales Order": (
+        "name", "customer", "customer_name", "transaction_date", "delivery_date", "currency",
+        "grand_total", "status", "per_delivered", "per_billed",
+    ),
+    "Delivery Note Detail": (
+        "name", "customer", "customer_name", "company", "posting_date", "posting_time", "currency",
+        "grand_total", "status", "per_billed", "is_return", "po_no", "shipping_address_name",
+        "contact_person", "lr_no", "lr_date", "transporter", "vehicle_no", "docstatus",
+    ),
+    "Delivery Note Item": (
+        "name", "item_code", "item_name", "description", "qty", "uom", "rate", "amount",
+        "warehouse", "serial_no", "serial_and_batch_bundle", "against_sales_order",
+        "against_sales_invoice",
+    ),
+    "Purchase Invoice": (
+        "name", "supplier", "supplier_name", "posting_date", "due_date", "bill_no", "currency",
+        "grand_total", "outstanding_amount", "status",
+    ),
+    "Journal Entry": (
+        "name", "title", "voucher_type", "posting_date", "company", "total_debit",
+        "total_credit", "cheque_no", "user_remark", "docstatus",
+    ),
+    "Bin": ("item_code", "warehouse", "actual_qty"),
+    "Payment Entry": (
+        "name", "payment_type", "posting_date", "party_type", "party", "party_name",
+        "paid_amount", "received_amount", "paid_from", "paid_to", "mode_of_payment",
+        "reference_no", "reference_date", "status",
+    ),
+    "Sales Invoice List": (
+        "name", "customer", "customer_name", "posting_date", "due_date", "grand_total",
+        "outstanding_amount", "status", "currency", "is_return", "creation", "modified",
+    ),
+    "Purchase Invoice List": (
+        "name", "supplier", "supplier_name", "posting_date", "due_date", "grand_total",
+        "outstanding_amount", "status", "currency", "is_return", "creation", "modified",
+    ),
+    "Customer List": (
+        "name", "customer_name", "customer_group", "territory", "customer_type", "disabled",
+        "creation", "modified", "credit_limit", "customer_primary_contact",
+        "customer_primary_address",
+    ),
+    "Quotation List": (
+        "name", "quotation_to", "party_name", "customer_name", "transaction_date", "valid_till",
+        "grand_total", "status", "currency", "order_type", "creation", "modified",
+    ),
+    "Sales Order List": (
+        "name", "customer", "customer_name", "transaction_date", "delivery_date", "grand_total",
+        "status", "delivery_status", "billing_status", "per_delivered", "per_billed", "currency",
+        "order_type", "creation", "modified",
+    ),
+    "Delivery Note List": (
+        "name", "customer", "customer_name", "posting_date", "grand_total", "status",
+        "per_billed", "currency", "lr_no", "lr_date", "transporter", "vehicle_no", "is_return",
+        "creation", "modified",
+    ),
+    "Service Protocol List": (
+        "name", "customer", "date_of_service", "notes", "docstatus", "creation", "modified",
+        "owner",
+    ),
+}
+
+# Default sort order per DocType for the paged getters
+ORDER_BY = {
+    "Employee": "employee_name asc",
+    "Purchase Order": "transaction_date desc",
+    "Customer": "customer_name asc",
+    "Bin": "item_code asc",
+    "Sales Order": "transaction_date desc",
+    "Purchase Invoice": "posting_date desc",
+    "Journal Entry": "posting_date desc",
+    "Payment Entry": "posting_date desc",
+    "Sales Invoice": "posting_date desc, posting_time desc",
+    "GL Entry": "posting_date desc, creation desc",
+}
+
+# Columns the list tools accept as sort_by
+SORT_FIELDS = {
+    "Invoice List": frozenset({
+        "name", "posting_date", "due_date", "grand_total", "outstanding_amount", "status",
+        "creation", "modified",
+    }),
+    "Customer List": frozenset({
+        "customer_name", "customer_group", "territory", "creation", "modified",
+    }),
+    "Quotation List": frozenset({
+        "name", "transaction_date", "valid_till", "grand_total", "status", "party_name",
+        "creation", "modified",
+    }),
+    "Sales Order List": frozenset({
+        "name", "transaction_date", "delivery_date", "grand_total", "status", "customer",
+        "per_delivered", "per_billed", "creation", "modified",
+    }),
+    "Delivery Note List": frozenset({
+        "name", "posting_date", "customer", "grand_total", "status", "per_billed", "creation",
+        "modified",
+    }),
+    "Service Protocol List": frozenset({
+        "name", "customer", "date_of_service", "creation", "modified",
+    }),
+}
+
+# Encoders for the types orjson does not handle natively, keyed on the exact type so that
+# json_serial is a single lookup. (orjson itself writes datetime and date values in ISO 8601.)
+_ENCODERS = {
+    Decimal: float,
+    timedelta: str,
+    bytes: lambda value: value.decode("utf-8", "replace"),
+    set: list,
+    frozenset: list,
+}
+
+# orjson options for tool results and responses: dict keys that are not strings (dates,
+# numbers from group-by results) are written as strings. Naive datetimes are written as they
+# are, without OPT_NAIVE_UTC, because Frappe stores them in the site's time zone, not in UTC.
+# Decimals stay numbers (float); currency values are far from float's 15 significant digits.
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+# Types json_serial has already reported as not serializable
+_unserializable_types = set()
+
 def json_serial(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, (datetime, date)):
-        return obj.isoformat()
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, timedelta):
-        return str(obj)
-    frappe.log_error(
-        title="Not serializable", message=f"Type {type(obj)} not serializable"
-    )
+    """
+    JSON serializer for the types orjson does not handle natively.
+    """
+    encoder = _ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+    # Reported once per type through the logger; an Error Log insert per value would put a
+    # database write inside serialization
+    if type(obj) not in _unserializable_types:
+        _unserializable_types.add(type(obj))
+        logger.warning("Type %s not serializable, writing it as a string", type(obj))
     try:
         return str(obj)
     except Exception:
         return ""
 
 
+def _dumps(obj):
+    """Serialize a tool result to a JSON string with orjson."""
+    return orjson.dumps(obj, default=json_serial, option=ORJSON_OPTIONS).decode()
+
+
+def json_tool(function):
+    """
+    Expose a tool that returns native data as one that returns a JSON string.
+    The undecorated function stays available as .raw for callers that serialize the
+    result themselves, so it is encoded exactly once.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        return _dumps(function(*args, **kwargs))
+    wrapper.raw = function
+    return wrapper
+
+
+def get_tool_cache_version(function_name):
+    """
+    Get the current cache generation of a memoized tool.
+    Invalidation replaces the generation instead of scanning for keys, so it is O(1).
+    """
+    key = f"{TOOL_CACHE_KEY}:{function_name}:version"
+    version = frappe.cache().get_value(key)
+    if version is None:
+        version = frappe.generate_hash(length=8)
+        frappe.cache().set_value(key, version)
+    return version
+
+
+def cached_tool(ttl=TOOL_CACHE_TTL):
+    """
+    Memoize a tool's result in the Redis cache for ttl seconds.
+    Results are keyed on the user (tools respect user permissions) and the arguments.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            arguments = orjson.dumps([args, kwargs], default=str, option=orjson.OPT_SORT_KEYS)
+            digest = hashlib.sha1(arguments).hexdigest()
+            version = get_tool_cache_version(function.__name__)
+            key = f"{TOOL_CACHE_KEY}:{function.__name__}:{version}:{frappe.session.user}:{digest}"
+
+            result = frappe.cache().get_value(key)
+            if result is None:
+                result = function(*args, **kwargs)
+                frappe.cache().set_value(key, result, expires_in_sec=ttl)
+            return result
+        wrapper.cached = True
+        return wrapper
+    return decorator
+
+
+def clear_tool_cache(doc, method=None):
+    """doc_events handler: drop memoized tool results that depend on the changed DocType."""
+    for function_name in CACHED_TOOL_DOCTYPES.get(doc.doctype, ()):
+        frappe.cache().delete_value(f"{TOOL_CACHE_KEY}:{function_name}:version")
+
+
+def get_row_limit(limit=None):
+    """Clamp a requested row count to the site's row cap (default: MAX_ROWS)."""
+    max_rows = cint(frappe.conf.get("erpnext_chatgpt_max_rows")) or MAX_ROWS
+    return max(1, min(cint(limit) or DEFAULT_ROW_LIMIT, max_rows))
+
+
+def get_limited_rows(doctype, filters, limit, order_by=None):
+    """
+    Fetch at most limit rows as tuples in the order of FIELDS[doctype].
+    One extra row is requested to tell whether more matched.
+    Callers send the field names once as "columns" instead of repeating them in every row.
+
+    :param order_by: Defaults to ORDER_BY[doctype]
+    :return: Tuple of the rows and whether the result was truncated
+    """
+    rows = frappe.db.get_all(
+        doctype,
+        filters=filters,
+        fields=list(FIELDS[doctype]),
+        order_by=order_by or ORDER_BY[doctype],
+        limit_page_length=limit + 1,
+        as_list=True
+    )
+    return rows[:limit], len(rows) > limit
+
+
+def get_default_company():
+    """
+    The session user's default company, looked up once per request.
+    frappe.local is reset for every request, so the memoized value cannot go stale.
+    """
+    company = getattr(frappe.local, 'chatgpt_company', None)
+    if company is None:
+        company = frappe.local.chatgpt_company = frappe.defaults.get_user_default("company")
+    return company
+
+
+def get_total_count(doctype, filters, rows, limit, offset=0):
+    """
+    Total number of rows matching filters, for pagination.
+    A page shorter than limit already tells the total, so the count query only runs for full pages.
+
+    :param offset: Position of the page's first row, None when it is not known (cursor pages)
+    """
+    if offset is not None:
+        offset = cint(offset)
+        if len(rows) < limit and (rows or not offset):
+            return offset + len(rows)
+    return frappe.db.count(doctype, filters=filters)
+
+
+def get_page(doctype, filters, fields, sort_by, sort_order, limit, offset=0, cursor=None):
+    """
+    Fetch one page of rows ordered by sort_by, with name breaking ties.
+
+    With a cursor (the next_cursor of the previous page) the page starts right after that
+    page's last row. The database seeks there through the sort column's index instead of
+    reading and discarding offset rows, so deep pages cost the same as the first; offset
+    is then ignored.
+
+    Rows whose sort_by is NULL cannot be compared against. Where the database sorts them
+    after every value (descending on MariaDB, ascending on PostgreSQL), they are read after
+    the last valued row; a page that ends on one hands out a cursor that continues by position.
+
+    :return: Tuple of the rows and the next page's cursor (None on the last page)
+    :raises ValueError: If the cursor is not one returned by this function
+    """
+    sort_order = 'asc' if str(sort_order).lower() == 'asc' else 'desc'
+    offset = cint(offset)
+    or_filters = None
+    if cursor:
+        try:
+            value, name, position = orjson.loads(cursor)
+        except TypeError:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        if value is None:
+            offset = cint(position)
+        else:
+            after = '>' if sort_order == 'asc' else '<'
+            # (sort_by, name) after (value, name): sort_by past value, or equal with a later name
+            base_filters = with_conditions(filters, []) if isinstance(filters, dict) else list(filters)
+            filters = base_filters + [[sort_by, f'{after}=', value]]
+            or_filters = [[sort_by, after, value], ['name', after, name]]
+            offset = 0
+            # Position of the page's first row, for a later fallback to offset paging
+            position = cint(position)
+    else:
+        position = offset
+
+    rows = frappe.db.get_all(
+        doctype,
+        filters=filters,
+        or_filters=or_filters,
+        fields=list(fields),
+        order_by=f'{sort_by} {sort_order}, name {sort_order}',
+        limit_start=offset,
+        limit_page_length=limit
+    )
+
+    nulls_last = (sort_order == 'desc') == (frappe.db.db_type != 'postgres')
+    if or_filters and nulls_last and len(rows) < limit:
+        # The comparison above skips NULLs; they follow the last valued row
+        rows += get_null_sorted_rows(doctype, base_filters, fields, sort_by, sort_order, limit - len(rows))
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = _dumps([rows[-1].get(sort_by), rows[-1]['name'], position + len(rows)])
+    return rows, next_cursor
+
+
+def get_null_sorted_rows(doctype, filters, fields, sort_by, sort_order, limit):
+    """
+    Up to limit rows matching filters whose sort_by is NULL, in name order, for get_page.
+    The "not set" filter also matches empty strings, which sort among the values, so those are
+    skipped here.
+    """
+    query_fields = list(fields) if sort_by in fields else list(fields) + [sort_by]
+    rows, start = [], 0
+    while len(rows) < limit:
+        batch = frappe.db.get_all(
+            doctype,
+            filters=filters + [[sort_by, 'is', 'not set']],
+            fields=list(query_fields),
+            order_by=f'name {sort_order}',
+            limit_start=start,
+            limit_page_length=limit
+        )
+        rows += [row for row in batch if row.get(sort_by) is None]
+        if len(batch) < limit:
+            break
+        start += limit
+
+    rows = rows[:limit]
+    if sort_by not in fields:
+        for row in rows:
+            row.pop(sort_by, None)
+    return rows
+
+
+def get_totals(doctype, filters, aggregates):
+    """
+    Compute aggregates over every row matching filters in one query.
+
+    :param aggregates: Dict of result key to SQL aggregate expression, e.g. {'total': 'sum(grand_total)'}
+    :return: Dict of result key to value, 0 when no rows matched
+    """
+    fields = [f'{expression} as {key}' for key, expression in aggregates.items()]
+    row = frappe.db.get_all(doctype, filters=filters, fields=fields)[0]
+    return {key: row.get(key) or 0 for key in aggregates}
+
+
+def get_cached_totals(doctype, filters, aggregates, ttl=TOOL_CACHE_TTL):
+    """
+    get_totals memoized in the Redis cache for ttl seconds, keyed on the filters.
+    Paging through one result set then aggregates it once instead of on every page.
+    Like a memoized tool it has a cache generation, "totals:<doctype>", which clear_tool_cache
+    replaces when a document it depends on changes (CACHED_TOOL_DOCTYPES).
+    """
+    arguments = orjson.dumps([doctype, filters, aggregates], default=str, option=orjson.OPT_SORT_KEYS)
+    version = get_tool_cache_version(f"totals:{doctype}")
+    key = f"{TOOL_CACHE_KEY}:totals:{doctype}:{version}:{hashlib.sha1(arguments).hexdigest()}"
+
+    totals = frappe.cache().get_value(key)
+    if totals is None:
+        totals = get_totals(doctype, filters, aggregates)
+        frappe.cache().set_value(key, totals, expires_in_sec=ttl)
+    return totals
+
+
+def name_filter(text, contains=False):
+    """
+    LIKE filter matching text at the start of a name, or anywhere in it when contains is set.
+    Only the prefix form can use an index on the column.
+    """
+    return ['like', f'%{text}%' if contains else f'{text}%']
+
+
+def value_range(low=None, high=None):
+    """
+    Filter value for low <= field <= high. Either bound may be omitted; None when both are.
+    0 is a bound like any other, so omitted means None.
+    The bounds are cast to numbers, so the model may pass them as strings.
+    """
+    if low is not None and high is not None:
+        return ['between', [flt(low), flt(high)]]
+    if low is not None:
+        return ['>=', flt(low)]
+    if high is not None:
+        return ['<=', flt(high)]
+    return None
+
+
+def date_range(fieldname, start_date=None, end_date=None):
+    """
+    Half-open range conditions on a date column: start_date <= fieldname < end_date + 1 day.
+    Either bound may be omitted. Comparing the bare column lets the database range-scan its
+    index, and the exclusive upper bound still covers every time of day on end_date.
+    The bounds are parsed into dates here, once, rather than passed on as strings.
+    """
+    conditions = []
+    if start_date:
+        conditions.append([fieldname, '>=', getdate(start_date)])
+    if end_date:
+        conditions.append([fieldname, '<', add_days(getdate(end_date), 1)])
+    return conditions
+
+
+def with_conditions(filters, conditions):
+    """
+    Combine a filters dict with extra [fieldname, operator, value] conditions.
+    Returns Frappe's list form, which unlike a dict can hold several conditions on one field.
+    """
+    filter_list = [
+        [fieldname, *value] if isinstance(value, (list, tuple)) else [fieldname, '=', value]
+        for fieldname, value in filters.items()
+    ]
+    return filter_list + conditions
+
+
+# Paged list tools: the DocType, the result key, the date column start_date/end_date apply to
+# (None when the tool takes no dates) and fixed filters added to the caller's equality filters
+LIST_TOOLS = {
+    "get_employees": {"doctype": "Employee", "key": "employees", "date_field": None},
+    "get_purchase_orders": {
+        "doctype": "Purchase Order", "key": "purchase_orders", "date_field": "transaction_date",
+    },
+    "get_stock_levels": {"doctype": "Bin", "key": "stock_levels", "date_field": None},
+    "get_outstanding_invoices": {
+        "doctype": "Sales Invoice", "key": "invoices", "date_field": None,
+        "filters": {"outstanding_amount": [">", 0]}, "order_by": "due_date asc",
+    },
+    "get_sales_orders": {
+        "doctype": "Sales Order", "key": "sales_orders", "date_field": "transaction_date",
+    },
+    "get_purchase_invoices": {
+        "doctype": "Purchase Invoice", "key": "purchase_invoices", "date_field": "posting_date",
+    },
+    "get_journal_entries": {
+        "doctype": "Journal Entry", "key": "journal_entries", "date_field": "posting_date",
+    },
+    "get_payments": {"doctype": "Payment Entry", "key": "payments", "date_field": "posting_date"},
+}
+
+
+def run_list_tool(name, limit=None, start_date=None, end_date=None, **equals):
+    """
+    Run a paged list tool described in LIST_TOOLS.
+    Keyword arguments that are set become equality filters.
+    """
+    spec = LIST_TOOLS[name]
+    filters = dict(spec.get("filters", {}))
+    filters.update((fieldname, value) for fieldname, value in equals.items() if value)
+
+    date_field = spec["date_field"]
+    if date_field:
+        if not start_date or not end_date:
+            return {"error": "start_date and end_date are required"}
+        filters = with_conditions(filters, date_range(date_field, start_date, end_date))
+
+    limit = get_row_limit(limit)
+    rows, truncated = get_limited_rows(spec["doctype"], filters, limit, spec.get("order_by"))
+    return {
+        'columns': FIELDS[spec["doctype"]],
+        spec["key"]: rows,
+        'limit': limit,
+        'truncated': truncated
+    }
+
+
+@json_tool
 def get_sales_invoices(start_date=None, end_date=None):
-    try:
-        filters = {}
-        if start_date and end_date:
-            filters['posting_date'] = ['between', [start_date, end_date]]
+    if not start_date or not end_date:
+        return {"error": "start_date and end_date are required"}
 
-        # Instead of fetching all fields, only get essential ones for summary
-        # This prevents memory issues with large datasets
+    try:
+        filters = with_conditions({}, date_range('posting_date', start_date, end_date))
+
+        # Totals for the whole period come from one aggregate query; only the
+        # detailed records that are returned are fetched
+        totals = get_totals('Sales Invoice', filters, {
+            'total_count': 'count(name)',
+            'total_sales': 'sum(grand_total)',
+            'total_outstanding': 'sum(outstanding_amount)',
+        })
         invoices = frappe.db.get_all(
             'Sales Invoice',
             filters=filters,
-            fields=[
-                'name', 'customer', 'customer_name', 'posting_date',
-                'grand_total', 'outstanding_amount', 'status', 'currency'
-            ],
-            limit=1000  # Add a reasonable limit to prevent huge responses
+            fields=list(FIELDS['Sales Invoice']),
+            order_by=ORDER_BY['Sales Invoice'],
+            limit=100  # Return max 100 detailed records
         )
-
-        # Calculate total sales for the period
-        total_sales = sum(inv.get('grand_total', 0) for inv in invoices)
-        total_outstanding = sum(inv.get('outstanding_amount', 0) for inv in invoices)
+        total_count, total_sales = totals['total_count'], totals['total_sales']
 
         # Log for debugging
-        logger.debug(f"get_sales_invoices: Found {len(invoices)} invoices for period {start_date} to {end_date}, total: {total_sales}")
+        logger.debug("get_sales_invoices: Found %s invoices for period %s to %s, total: %s", total_count, start_date, end_date, total_sales)
 
-        return json.dumps({
-            'invoices': invoices[:100],  # Return max 100 detailed records
-            'total_count': len(invoices),
+        return {
+            'invoices': invoices,
+            'total_count': total_count,
             'total_sales': total_sales,
-            'total_outstanding': total_outstanding,
+            'total_outstanding': totals['total_outstanding'],
             'period': {'start': start_date, 'end': end_date},
-            'truncated': len(invoices) > 100,
-            'message': f"Found {len(invoices)} invoices with total sales of {total_sales}"
-        }, default=json_serial)
+            'truncated': total_count > len(invoices),
+            'message': f"Found {total_count} invoices with total sales of {total_sales}"
+        }
     except Exception as e:
         frappe.log_error(f"Error in get_sales_invoices: {str(e)}", "OpenAI Tool Error")
-        return json.dumps({
+        return {
             'error': str(e),
             'invoices': [],
             'total_count': 0,
             'total_sales': 0
-        }, default=json_serial)
+        }
 
 get_sales_invoices_tool = {
     "type": "function",
@@ -91,10 +619,219 @@ get_sales_invoices_tool = {
 }
 
 
+# SQL expression for each period bucket accepted by get_sales_totals_by_period, per database type
+PERIOD_BUCKETS = {
+    'day': {
+        'mariadb': "date_format(posting_date, '%%Y-%%m-%%d')",
+        'postgres': "to_char(posting_date, 'YYYY-MM-DD')",
+    },
+    'month': {
+        'mariadb': "date_format(posting_date, '%%Y-%%m')",
+        'postgres': "to_char(posting_date, 'YYYY-MM')",
+    },
+    'quarter': {
+        'mariadb': "concat(year(posting_date), '-Q', quarter(posting_date))",
+        'postgres': "to_char(posting_date, 'YYYY-\"Q\"Q')",
+    },
+    'year': {
+        'mariadb': "cast(year(posting_date) as char)",
+        'postgres': "to_char(posting_date, 'YYYY')",
+    },
+}
+
+# Sales Invoice columns get_sales_totals_by_period can group by besides the period
+SALES_TOTALS_GROUP_BY = ('customer', 'customer_group', 'territory', 'currency')
+
+
+@json_tool
+def get_sales_totals_by_period(start_date=None, end_date=None, bucket='month', group_by=None, limit=None):
+    """
+    Sum submitted sales invoices per period (and optionally per customer, group or territory)
+    in the database, so the model gets a few summary rows instead of every invoice.
+    """
+    if not start_date or not end_date:
+        return {"error": "start_date and end_date are required"}
+    if bucket not in PERIOD_BUCKETS:
+        return {"error": f"bucket must be one of: {', '.join(PERIOD_BUCKETS)}"}
+    if group_by and group_by not in SALES_TOTALS_GROUP_BY:
+        return {"error": f"group_by must be one of: {', '.join(SALES_TOTALS_GROUP_BY)}"}
+
+    limit = get_row_limit(limit)
+    group_column = f', `{group_by}`' if group_by else ''
+    rows = frappe.db.sql(f"""
+        select {PERIOD_BUCKETS[bucket][frappe.db.db_type]} as period{group_column},
+            sum(grand_total) as total, sum(outstanding_amount) as outstanding, count(*) as invoice_count
+        from `tabSales Invoice`
+        where docstatus = 1 and posting_date >= %(start_date)s and posting_date < %(end_date)s
+        group by period{group_column}
+        order by period, total desc
+        limit %(limit)s
+    """, {'start_date': getdate(start_date), 'end_date': add_days(getdate(end_date), 1), 'limit': limit + 1}, as_dict=True)
+
+    return {
+        'totals': rows[:limit],
+        'bucket': bucket,
+        'group_by': group_by,
+        'period': {'start': start_date, 'end': end_date},
+        'limit': limit,
+        'truncated': len(rows) > limit
+    }
+
+
+get_sales_totals_by_period_tool = {
+    "type": "function",
+    "function": {
+        "name": "get_sales_totals_by_period",
+        "description": "Get sales totals (sum, outstanding, invoice count) of submitted sales invoices per day, month, quarter or year, optionally split by customer, customer group, territory or currency. Prefer this over listing invoices for totals, trends and top-customer questions.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format",
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format",
+                },
+                "bucket": {
+                    "type": "string",
+                    "enum": ["day", "month", "quarter", "year"],
+                    "description": "Period to total by",
+                    "default": "month"
+                },
+                "group_by": {
+                    "type": "string",
+                    "enum": ["customer", "customer_group", "territory", "currency"],
+                    "description": "Optional column to split each period by",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
+            },
+            "required": ["start_date", "end_date"],
+        },
+    },
+}
+
+
+# Summary aggregates shared by sales and purchase invoice lists
+INVOICE_SUMMARY = {
+    'total_invoices': 'count(name)',
+    'total_amount': 'sum(grand_total)',
+    'total_outstanding': 'sum(outstanding_amount)',
+    'average_amount': 'avg(grand_total)',
+}
+
+# Summary aggregates of list_delivery_notes (the first one counts the notes)
+DELIVERY_NOTE_SUMMARY = {
+    'total_notes': 'count(name)',
+    'total_amount': 'sum(grand_total)',
+    'average_amount': 'avg(grand_total)',
+    'average_billing_percentage': 'avg(per_billed)',
+}
+
+# Totals list_service_protocols reports over every matching protocol; the device count
+# comes from the Service Protocol Item rows joined in by get_all
+SERVICE_PROTOCOL_SUMMARY = {
+    'total_protocols': 'count(distinct `tabService Protocol`.name)',
+    'total_devices_serviced': 'count(`tabService Protocol Item`.name)',
+    'earliest': 'min(`tabService Protocol`.date_of_service)',
+    'latest': 'max(`tabService Protocol`.date_of_service)',
+}
+
+# Party column of each invoice DocType list_invoices accepts
+INVOICE_PARTY_FIELDS = {"Sales Invoice": "customer", "Purchase Invoice": "supplier"}
+
+# Invoice statuses behind list_invoices' is_paid, keyed by DocType then is_paid. Filtering on
+# status rather than outstanding_amount lets the (status, posting_date) index serve the query.
+INVOICE_PAYMENT_STATUSES = {
+    "Sales Invoice": {
+        True: ("Paid", "Credit Note Issued", "Return"),
+        False: (
+            "Unpaid", "Partly Paid", "Overdue", "Unpaid and Discounted",
+            "Partly Paid and Discounted", "Overdue and Discounted",
+        ),
+    },
+    "Purchase Invoice": {
+        True: ("Paid", "Debit Note Issued", "Return"),
+        False: ("Unpaid", "Partly Paid", "Overdue"),
+    },
+}
+
+# Shape of the transaction lists behind list_invoices, list_quotations and list_sales_orders:
+# the result key, the FIELDS and SORT_FIELDS entries, the default sort column and the summary
+# aggregates (the first one counts the documents)
+DOCUMENT_LISTS = {
+    "Sales Invoice": {
+        "key": "invoices", "fields": "Sales Invoice List", "sort_fields": "Invoice List",
+        "sort_by": "posting_date", "summary": INVOICE_SUMMARY,
+    },
+    "Purchase Invoice": {
+        "key": "invoices", "fields": "Purchase Invoice List", "sort_fields": "Invoice List",
+        "sort_by": "posting_date", "summary": INVOICE_SUMMARY,
+    },
+    "Quotation": {
+        "key": "quotations", "fields": "Quotation List", "sort_fields": "Quotation List",
+        "sort_by": "transaction_date", "summary": {
+            'total_quotations': 'count(name)',
+            'total_amount': 'sum(grand_total)',
+            'average_amount': 'avg(grand_total)',
+        },
+    },
+    "Sales Order": {
+        "key": "sales_orders", "fields": "Sales Order List", "sort_fields": "Sales Order List",
+        "sort_by": "transaction_date", "summary": {
+            'total_orders': 'count(name)',
+            'total_amount': 'sum(grand_total)',
+            'average_amount': 'avg(grand_total)',
+            'average_delivery_percentage': 'avg(per_delivered)',
+            'average_billing_percentage': 'avg(per_billed)',
+        },
+    },
+}
+
+
+def list_documents(doctype, filters, date_conditions, sort_by, sort_order, limit, offset, cursor,
+                   include_count=True):
+    """
+    Shared body of list_invoices, list_quotations and list_sales_orders, driven by
+    DOCUMENT_LISTS[doctype]: one page of documents, plus totals over every matching
+    document (not just the page) whose count doubles as total_count.
+    Without include_count the totals are skipped and total_count and summary are None.
+    """
+    spec = DOCUMENT_LISTS[doctype]
+    limit = get_row_limit(limit)
+    filters = with_conditions(filters, date_conditions)
+    if sort_by not in SORT_FIELDS[spec["sort_fields"]]:
+        sort_by = spec["sort_by"]
+
+    try:
+        rows, next_cursor = get_page(
+            doctype, filters, list(FIELDS[spec["fields"]]), sort_by, sort_order, limit, offset, cursor
+        )
+    except ValueError:
+        return {"error": "Invalid cursor. Pass the next_cursor of the previous page."}
+
+    summary = get_cached_totals(doctype, filters, spec["summary"]) if include_count else None
+    return {
+        spec["key"]: rows,
+        'total_count': next(iter(summary.values())) if summary else None,
+        'limit': limit,
+        'offset': offset,
+        'next_cursor': next_cursor,
+        'summary': summary
+    }
+
+
+@json_tool
 def list_invoices(
     invoice_type="Sales Invoice",
     customer=None,
     supplier=None,
+    contains=False,
     status=None,
     start_date=None,
     end_date=None,
@@ -104,108 +841,44 @@ def list_invoices(
     sort_by="posting_date",
     sort_order="desc",
     limit=100,
-    offset=0
+    offset=0,
+    cursor=None
 ):
     """
     List invoices (Sales or Purchase) with advanced filtering and sorting options
     """
     # Determine the doctype based on invoice_type
-    if invoice_type not in ["Sales Invoice", "Purchase Invoice"]:
-        return json.dumps({
+    party_field = INVOICE_PARTY_FIELDS.get(invoice_type)
+    if not party_field:
+        return {
             "error": "Invalid invoice_type. Must be 'Sales Invoice' or 'Purchase Invoice'"
-        }, default=json_serial)
+        }
 
     filters = {}
 
-    # Apply filters based on invoice type
-    if invoice_type == "Sales Invoice":
-        if customer:
-            filters['customer'] = ['like', f'%{customer}%']
-    else:  # Purchase Invoice
-        if supplier:
-            filters['supplier'] = ['like', f'%{supplier}%']
+    # Party filter of the invoice type: customer for sales, supplier for purchase
+    party = {'customer': customer, 'supplier': supplier}[party_field]
+    if party:
+        filters[party_field] = name_filter(party, contains)
 
     # Common filters
     if status:
         filters['status'] = status
-    if start_date and end_date:
-        filters['posting_date'] = ['between', [start_date, end_date]]
-    elif start_date:
-        filters['posting_date'] = ['>=', start_date]
-    elif end_date:
-        filters['posting_date'] = ['<=', end_date]
-
-    if min_amount and max_amount:
-        filters['grand_total'] = ['between', [min_amount, max_amount]]
-    elif min_amount:
-        filters['grand_total'] = ['>=', min_amount]
-    elif max_amount:
-        filters['grand_total'] = ['<=', max_amount]
+    date_conditions = date_range('posting_date', start_date, end_date)
 
-    if is_paid is not None:
-        if is_paid:
-            filters['outstanding_amount'] = 0
-        else:
-            filters['outstanding_amount'] = ['>', 0]
-
-    # Validate sort_by field
-    valid_sort_fields = ['name', 'posting_date', 'due_date', 'grand_total',
-                        'outstanding_amount', 'status', 'creation', 'modified']
-    if sort_by not in valid_sort_fields:
-        sort_by = 'posting_date'
-
-    # Build order_by clause
-    order_by = f'{sort_by} {sort_order}'
-
-    # Select appropriate fields based on invoice type
-    if invoice_type == "Sales Invoice":
-        fields = ['name', 'customer', 'customer_name', 'posting_date', 'due_date',
-                 'grand_total', 'outstanding_amount', 'status', 'currency',
-                 'is_return', 'creation', 'modified']
-    else:
-        fields = ['name', 'supplier', 'supplier_name', 'posting_date', 'due_date',
-                 'grand_total', 'outstanding_amount', 'status', 'currency',
-                 'is_return', 'creation', 'modified']
-
-    invoices = frappe.db.get_all(
-        invoice_type,
-        filters=filters,
-        fields=fields,
-        order_by=order_by,
-        limit_start=offset,
-        limit_page_length=limit
-    )
+    amount_range = value_range(min_amount, max_amount)
+    if amount_range:
+        filters['grand_total'] = amount_range
 
-    # Get count for pagination
-    total_count = frappe.db.count(invoice_type, filters=filters)
-
-    # Calculate summary statistics - simplified approach
-    if invoices:
-        total_amount = sum(inv.get('grand_total', 0) for inv in invoices)
-        total_outstanding = sum(inv.get('outstanding_amount', 0) for inv in invoices)
-        average_amount = total_amount / len(invoices) if invoices else 0
-        summary = {
-            'total_invoices': len(invoices),
-            'total_amount': total_amount,
-            'total_outstanding': total_outstanding,
-            'average_amount': average_amount
-        }
-    else:
-        summary = {
-            'total_invoices': 0,
-            'total_amount': 0,
-            'total_outstanding': 0,
-            'average_amount': 0
-        }
+    if is_paid is not None:
+        # Paid or unpaid statuses, narrowed to the requested status when there is one
+        statuses = INVOICE_PAYMENT_STATUSES[invoice_type][bool(is_paid)]
+        filters['status'] = ['in', [s for s in statuses if not status or s == status]]
 
-    return json.dumps({
+    return {
         'invoice_type': invoice_type,
-        'invoices': invoices,
-        'total_count': total_count,
-        'limit': limit,
-        'offset': offset,
-        'summary': summary
-    }, default=json_serial)
+        **list_documents(invoice_type, filters, date_conditions, sort_by, sort_order, limit, offset, cursor)
+    }
 
 
 list_invoices_tool = {
@@ -223,11 +896,16 @@ list_invoices_tool = {
                 },
                 "customer": {
                     "type": "string",
-                    "description": "Filter by customer name (for Sales Invoice, partial match)",
+                    "description": "Filter by customer name (for Sales Invoice, matches the start of the name)",
                 },
                 "supplier": {
                     "type": "string",
-                    "description": "Filter by supplier name (for Purchase Invoice, partial match)",
+                    "description": "Filter by supplier name (for Purchase Invoice, matches the start of the name)",
+                },
+                "contains": {
+                    "type": "boolean",
+                    "description": "Match the name anywhere instead of only at the start (slower)",
+                    "default": False
                 },
                 "status": {
                     "type": "string",
@@ -272,6 +950,10 @@ list_invoices_tool = {
                     "type": "integer",
                     "description": "Number of records to skip",
                     "default": 0
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page, to fetch the page after it (use instead of offset for deep pages)",
                 }
             },
             "required": [],
@@ -280,14 +962,29 @@ list_invoices_tool = {
 }
 
 
+@json_tool
 def get_sales_invoice(invoice_number):
+    if not invoice_number:
+        return {"error": "invoice_number is required"}
+
     invoice = frappe.db.get_value(
         'Sales Invoice',
         invoice_number,
-        '*',
+        list(FIELDS['Sales Invoice Detail']),
         as_dict=True
     )
-    return json.dumps([invoice] if invoice else [], default=json_serial)
+    if not invoice:
+        return []
+
+    # Line items and taxes with the invoice, so the model needs no follow-up calls for them
+    for key, doctype in (('items', 'Sales Invoice Item'), ('taxes', 'Sales Taxes and Charges')):
+        invoice[key] = frappe.db.get_all(
+            doctype,
+            filters={'parent': invoice_number, 'parenttype': 'Sales Invoice'},
+            fields=list(FIELDS[doctype]),
+            order_by='idx asc'
+        )
+    return [invoice]
 
 
 get_sales_invoice_tool = {
@@ -309,19 +1006,10 @@ get_sales_invoice_tool = {
 }
 
 
-def get_employees(department=None, designation=None):
-    filters = {}
-    if department:
-        filters['department'] = department
-    if designation:
-        filters['designation'] = designation
-
-    employees = frappe.db.get_all(
-        'Employee',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(employees, default=json_serial)
+@json_tool
+@cached_tool()
+def get_employees(department=None, designation=None, limit=None):
+    return run_list_tool('get_employees', limit, department=department, designation=designation)
 
 
 get_employees_tool = {
@@ -340,6 +1028,11 @@ get_employees_tool = {
                     "type": "string",
                     "description": "Designation",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
             },
             "required": [],
         },
@@ -347,19 +1040,9 @@ get_employees_tool = {
 }
 
 
-def get_purchase_orders(start_date=None, end_date=None, supplier=None):
-    filters = {}
-    if start_date and end_date:
-        filters['transaction_date'] = ['between', [start_date, end_date]]
-    if supplier:
-        filters['supplier'] = supplier
-
-    purchase_orders = frappe.db.get_all(
-        'Purchase Order',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(purchase_orders, default=json_serial)
+@json_tool
+def get_purchase_orders(start_date=None, end_date=None, supplier=None, limit=None):
+    return run_list_tool('get_purchase_orders', limit, start_date, end_date, supplier=supplier)
 
 
 get_purchase_orders_tool = {
@@ -382,6 +1065,11 @@ get_purchase_orders_tool = {
                     "type": "string",
                     "description": "Supplier name",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
             },
             "required": ["start_date", "end_date"],
         },
@@ -389,31 +1077,44 @@ get_purchase_orders_tool = {
 }
 
 
-def get_customers(customer_name=None):
+@json_tool
+@cached_tool()
+def get_customers(customer_name=None, contains=False, limit=None):
+    limit = get_row_limit(limit)
     filters = {}
     if customer_name:
-        # Use partial match for customer name search
-        filters['customer_name'] = ['like', f'%{customer_name}%']
+        filters['customer_name'] = name_filter(customer_name, contains)
 
-    customers = frappe.db.get_all(
-        'Customer',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(customers, default=json_serial)
+    customers, truncated = get_limited_rows('Customer', filters, limit)
+    return {
+        'columns': FIELDS['Customer'],
+        'customers': customers,
+        'limit': limit,
+        'truncated': truncated
+    }
 
 
 get_customers_tool = {
     "type": "function",
     "function": {
         "name": "get_customers",
-        "description": "Search for customers by name (partial match supported). Returns customer details including group, type, and territory. Use when searching for specific customers.",
+        "description": "Search for customers by name. Returns customer details including group, type, and territory. Use when searching for specific customers.",
         "parameters": {
             "type": "object",
             "properties": {
                 "customer_name": {
                     "type": "string",
-                    "description": "Customer name to search for (partial match supported)",
+                    "description": "Beginning of the customer name to search for",
+                },
+                "contains": {
+                    "type": "boolean",
+                    "description": "Match the text anywhere in the customer name instead of only at the start",
+                    "default": False
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
                 },
             },
             "required": [],
@@ -422,8 +1123,11 @@ get_customers_tool = {
 }
 
 
+@json_tool
+@cached_tool()
 def list_customers(
     customer_name=None,
+    contains=False,
     customer_group=None,
     territory=None,
     customer_type=None,
@@ -431,16 +1135,18 @@ def list_customers(
     sort_by="creation",
     sort_order="desc",
     limit=100,
-    offset=0
+    offset=0,
+    cursor=None
 ):
     """
     List customers with advanced filtering and sorting options
     """
+    limit = get_row_limit(limit)
     filters = {}
 
     # Apply filters
     if customer_name:
-        filters['customer_name'] = ['like', f'%{customer_name}%']
+        filters['customer_name'] = name_filter(customer_name, contains)
     if customer_group:
         filters['customer_group'] = customer_group
     if territory:
@@ -451,33 +1157,25 @@ def list_customers(
         filters['disabled'] = disabled
 
     # Validate sort_by field
-    valid_sort_fields = ['customer_name', 'customer_group', 'territory', 'creation', 'modified']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['Customer List']:
         sort_by = 'creation'
 
-    # Build order_by clause
-    order_by = f'{sort_by} {sort_order}'
-
-    customers = frappe.db.get_all(
-        'Customer',
-        filters=filters,
-        fields=['name', 'customer_name', 'customer_group', 'territory',
-                'customer_type', 'disabled', 'creation', 'modified',
-                'credit_limit', 'customer_primary_contact', 'customer_primary_address'],
-        order_by=order_by,
-        limit_start=offset,
-        limit_page_length=limit
-    )
+    try:
+        customers, next_cursor = get_page(
+            'Customer', filters, list(FIELDS['Customer List']), sort_by, sort_order, limit, offset, cursor
+        )
+    except ValueError:
+        return {"error": "Invalid cursor. Pass the next_cursor of the previous page."}
 
-    # Get count for pagination
-    total_count = frappe.db.count('Customer', filters=filters)
+    total_count = get_total_count('Customer', filters, customers, limit, None if cursor else offset)
 
-    return json.dumps({
+    return {
         'customers': customers,
         'total_count': total_count,
         'limit': limit,
-        'offset': offset
-    }, default=json_serial)
+        'offset': offset,
+        'next_cursor': next_cursor
+    }
 
 
 list_customers_tool = {
@@ -490,7 +1188,12 @@ list_customers_tool = {
             "properties": {
                 "customer_name": {
                     "type": "string",
-                    "description": "Filter by customer name (partial match)",
+                    "description": "Filter by customer name (matches the start of the name)",
+                },
+                "contains": {
+                    "type": "boolean",
+                    "description": "Match the name anywhere instead of only at the start (slower)",
+                    "default": False
                 },
                 "customer_group": {
                     "type": "string",
@@ -527,6 +1230,10 @@ list_customers_tool = {
                     "type": "integer",
                     "description": "Number of records to skip",
                     "default": 0
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page, to fetch the page after it (use instead of offset for deep pages)",
                 }
             },
             "required": [],
@@ -535,58 +1242,185 @@ list_customers_tool = {
 }
 
 
-def get_stock_levels(item_code=None):
-    filters = {}
-    if item_code:
-        filters['item_code'] = item_code
+@json_tool
+@cached_tool()
+def get_stock_levels(item_code=None, limit=None):
+    return run_list_tool('get_stock_levels', limit, item_code=item_code)
+
+
+get_stock_levels_tool = {
+    "type": "function",
+    "function": {
+        "name": "get_stock_levels",
+        "description": "Get current stock quantities for items across all warehouses. Returns available quantity, reserved quantity, and warehouse-wise breakdown. Use for inventory queries.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "item_code": {
+                    "type": "string",
+                    "description": "Item code",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
+            },
+            "required": [],
+        },
+    },
+}
+
+
+def build_gl_entries_query(start_date, end_date, account=None, limit=None):
+    """
+    Build the parameterized GL Entry select shared by get_general_ledger_entries and the
+    NDJSON export. GL Entry is the largest table these tools read, so it is queried directly
+    instead of going through the get_all query builder and its row post-processing.
+
+    :return: Tuple of the SQL and its values
+    """
+    conditions = ['posting_date >= %(start_date)s', 'posting_date < %(end_date)s']
+    values = {'start_date': getdate(start_date), 'end_date': add_days(getdate(end_date), 1)}
+    if account:
+        conditions.append('account = %(account)s')
+        values['account'] = account
+
+    limit_clause = ''
+    if limit:
+        limit_clause = 'limit %(limit)s'
+        values['limit'] = limit
+
+    columns = ', '.join(f'`{field}`' for field in FIELDS['GL Entry'])
+    query = f"""
+        select {columns}
+        from `tabGL Entry`
+        where {' and '.join(conditions)}
+        order by {ORDER_BY['GL Entry']}
+        {limit_clause}
+    """
+    return query, values
+
+
+# DocTypes export_documents_ndjson can stream, with the date column its range applies to
+EXPORT_DATE_FIELDS = {
+    "Sales Invoice": "posting_date",
+    "Purchase Invoice": "posting_date",
+    "Sales Order": "transaction_date",
+    "Purchase Order": "transaction_date",
+    "Journal Entry": "posting_date",
+    "Payment Entry": "posting_date",
+}
+
+
+def build_document_export_query(doctype, start_date, end_date):
+    """
+    Build the parameterized select behind export_documents_ndjson: the DocType's FIELDS
+    in its ORDER_BY order, for a half-open range on its EXPORT_DATE_FIELDS column.
+
+    :return: Tuple of the SQL and its values
+    """
+    date_field = EXPORT_DATE_FIELDS[doctype]
+    columns = ', '.join(f'`{field}`' for field in FIELDS[doctype])
+    query = f"""
+        select {columns}
+        from `tab{doctype}`
+        where `{date_field}` >= %(start_date)s and `{date_field}` < %(end_date)s
+        order by {ORDER_BY[doctype]}
+    """
+    return query, {'start_date': getdate(start_date), 'end_date': add_days(getdate(end_date), 1)}
+
 
-    stock_levels = frappe.db.get_all(
-        'Bin',
-        filters=filters,
-        fields=['item_code', 'warehouse', 'actual_qty']
-    )
-    return json.dumps(stock_levels, default=json_serial)
+@json_tool
+def get_general_ledger_entries(start_date=None, end_date=None, account=None, limit=None):
+    if not start_date or not end_date:
+        return {"error": "start_date and end_date are required"}
 
+    limit = get_row_limit(limit)
+    # One extra row tells whether more entries matched
+    query, values = build_gl_entries_query(start_date, end_date, account, limit + 1)
+    rows = frappe.db.sql(query, values)
+    gl_entries, truncated = rows[:limit], len(rows) > limit
 
-get_stock_levels_tool = {
+    return {
+        'columns': FIELDS['GL Entry'],
+        'gl_entries': gl_entries,
+        'limit': limit,
+        'truncated': truncated
+    }
+
+
+get_general_ledger_entries_tool = {
     "type": "function",
     "function": {
-        "name": "get_stock_levels",
-        "description": "Get current stock quantities for items across all warehouses. Returns available quantity, reserved quantity, and warehouse-wise breakdown. Use for inventory queries.",
+        "name": "get_general_ledger_entries",
+        "description": "Retrieve general ledger entries for accounting analysis. Returns debit/credit entries with account details, voucher references, and balances. Use for financial transaction queries.",
         "parameters": {
             "type": "object",
             "properties": {
-                "item_code": {
+                "start_date": {
                     "type": "string",
-                    "description": "Item code",
+                    "description": "Start date in YYYY-MM-DD format",
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format",
+                },
+                "account": {
+                    "type": "string",
+                    "description": "Account name",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
                 },
             },
-            "required": [],
+            "required": ["start_date", "end_date"],
         },
     },
 }
 
 
-def get_general_ledger_entries(start_date=None, end_date=None, account=None):
-    filters = {}
-    if start_date and end_date:
-        filters['posting_date'] = ['between', [start_date, end_date]]
-    if account:
-        filters['account'] = account
+@json_tool
+def get_gl_totals_by_account(start_date=None, end_date=None, account=None, limit=None):
+    """
+    Sum debits and credits per account in the database, so the model gets one row per
+    account instead of every ledger entry.
+    """
+    if not start_date or not end_date:
+        return {"error": "start_date and end_date are required"}
 
-    gl_entries = frappe.db.get_all(
-        'GL Entry',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(gl_entries, default=json_serial)
+    limit = get_row_limit(limit)
+    conditions = ['is_cancelled = 0', 'posting_date >= %(start_date)s', 'posting_date < %(end_date)s']
+    values = {'start_date': getdate(start_date), 'end_date': add_days(getdate(end_date), 1), 'limit': limit + 1}
+    if account:
+        conditions.append('account like %(account)s')
+        values['account'] = f'{account}%'
+
+    rows = frappe.db.sql(f"""
+        select account, sum(debit) as debit, sum(credit) as credit,
+            sum(debit) - sum(credit) as balance, count(*) as entry_count
+        from `tabGL Entry`
+        where {' and '.join(conditions)}
+        group by account
+        order by account
+        limit %(limit)s
+    """, values, as_dict=True)
+
+    return {
+        'totals': rows[:limit],
+        'period': {'start': start_date, 'end': end_date},
+        'limit': limit,
+        'truncated': len(rows) > limit
+    }
 
 
-get_general_ledger_entries_tool = {
+get_gl_totals_by_account_tool = {
     "type": "function",
     "function": {
-        "name": "get_general_ledger_entries",
-        "description": "Retrieve general ledger entries for accounting analysis. Returns debit/credit entries with account details, voucher references, and balances. Use for financial transaction queries.",
+        "name": "get_gl_totals_by_account",
+        "description": "Get total debit, credit and balance per account from the general ledger for a period. Prefer this over listing ledger entries for account balances and totals.",
         "parameters": {
             "type": "object",
             "properties": {
@@ -600,7 +1434,12 @@ get_general_ledger_entries_tool = {
                 },
                 "account": {
                     "type": "string",
-                    "description": "Account name",
+                    "description": "Optional beginning of the account name to restrict to",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
                 },
             },
             "required": ["start_date", "end_date"],
@@ -609,23 +1448,34 @@ get_general_ledger_entries_tool = {
 }
 
 
+@json_tool
 def get_profit_and_loss_statement(
     period_start_date=None, period_end_date=None, periodicity=None
 ):
     if not period_start_date or not period_end_date or not periodicity:
-        return json.dumps(
-            {
-                "error": "period_start_date, periodicity and period_end_date are required"
-            },
-            default=json_serial,
-        )
+        return {
+            "error": "period_start_date, periodicity and period_end_date are required"
+        }
 
-    report = frappe.get_doc("Report", "Profit and Loss Statement")
     filters = {
+        "filter_based_on": "Date Range",
         "period_start_date": period_start_date,
         "period_end_date": period_end_date,
         "periodicity": periodicity,
-        "company": frappe.defaults.get_user_default("company"),
+        "company": get_default_company(),
+    }
+
+    # Run the report here rather than as a prepared report in the background, which would
+    # return no rows; run() also checks the user's permission on the report
+    data = run_report("Profit and Loss Statement", filters=filters, ignore_prepared_report=True)
+    return {
+        'columns': [
+            {'fieldname': column.get('fieldname'), 'label': column.get('label')}
+            for column in data.get('columns') or []
+            if isinstance(column, dict)
+        ],
+        'result': data.get('result') or [],
+        'report_summary': data.get('report_summary'),
     }
 
 
@@ -656,17 +1506,10 @@ get_profit_and_loss_statement_tool = {
 }
 
 
-def get_outstanding_invoices(customer=None):
-    filters = {'outstanding_amount': ['>', 0]}
-    if customer:
-        filters['customer'] = customer
-
-    invoices = frappe.db.get_all(
-        'Sales Invoice',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(invoices, default=json_serial)
+@json_tool
+@cached_tool()
+def get_outstanding_invoices(customer=None, limit=None):
+    return run_list_tool('get_outstanding_invoices', limit, customer=customer)
 
 
 get_outstanding_invoices_tool = {
@@ -681,25 +1524,20 @@ get_outstanding_invoices_tool = {
                     "type": "string",
                     "description": "Customer name",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
             },
             "required": [],
         },
     },
 }
 
-def get_sales_orders(start_date=None, end_date=None, customer=None):
-    filters = {}
-    if start_date and end_date:
-        filters['transaction_date'] = ['between', [start_date, end_date]]
-    if customer:
-        filters['customer'] = customer
-
-    sales_orders = frappe.db.get_all(
-        'Sales Order',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(sales_orders, default=json_serial)
+@json_tool
+def get_sales_orders(start_date=None, end_date=None, customer=None, limit=None):
+    return run_list_tool('get_sales_orders', limit, start_date, end_date, customer=customer)
 
 
 get_sales_orders_tool = {
@@ -722,6 +1560,88 @@ get_sales_orders_tool = {
                     "type": "string",
                     "description": "Customer name",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
+            },
+            "required": ["start_date", "end_date"],
+        },
+    },
+}
+
+
+# Row shape shared by the three parts of get_sales_overview, so they can be read in one UNION ALL
+SALES_OVERVIEW_COLUMNS = ("name", "customer", "date", "grand_total", "outstanding_amount", "status")
+SALES_OVERVIEW_PARTS = ("sales_invoices", "sales_orders", "outstanding_invoices")
+
+
+@json_tool
+def get_sales_overview(start_date=None, end_date=None, limit=None):
+    """
+    Sales invoices and sales orders in a date range plus all outstanding invoices, read in one
+    round trip instead of three tool calls. Each part is capped at limit rows.
+    """
+    if not start_date or not end_date:
+        return {"error": "start_date and end_date are required"}
+
+    limit = get_row_limit(limit)
+    rows = frappe.db.sql("""
+        (select 'sales_invoices' as part, name, customer, posting_date, grand_total,
+            outstanding_amount, status
+        from `tabSales Invoice`
+        where posting_date >= %(start_date)s and posting_date < %(end_date)s
+        order by posting_date desc, name desc
+        limit %(limit)s)
+        union all
+        (select 'sales_orders', name, customer, transaction_date, grand_total, null, status
+        from `tabSales Order`
+        where transaction_date >= %(start_date)s and transaction_date < %(end_date)s
+        order by transaction_date desc, name desc
+        limit %(limit)s)
+        union all
+        (select 'outstanding_invoices', name, customer, due_date, grand_total,
+            outstanding_amount, status
+        from `tabSales Invoice`
+        where outstanding_amount > 0
+        order by due_date asc, name asc
+        limit %(limit)s)
+    """, {'start_date': getdate(start_date), 'end_date': add_days(getdate(end_date), 1), 'limit': limit + 1})
+
+    # One extra row per part tells whether more matched
+    parts = {part: [] for part in SALES_OVERVIEW_PARTS}
+    for row in rows:
+        parts[row[0]].append(row[1:])
+    result = {'columns': SALES_OVERVIEW_COLUMNS}
+    for part, part_rows in parts.items():
+        result[part] = part_rows[:limit]
+    result['limit'] = limit
+    result['truncated'] = [part for part, part_rows in parts.items() if len(part_rows) > limit]
+    return result
+
+
+get_sales_overview_tool = {
+    "type": "function",
+    "function": {
+        "name": "get_sales_overview",
+        "description": "Get sales invoices and sales orders in a date range together with all outstanding invoices, in one call. Prefer this over calling get_sales_invoices, get_sales_orders and get_outstanding_invoices separately when all three are needed. The outstanding invoices' date is the due date.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "start_date": {
+                    "type": "string",
+                    "description": "Start date in YYYY-MM-DD format",
+                },
+                "end_date": {
+                    "type": "string",
+                    "description": "End date in YYYY-MM-DD format",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return for each of the three lists",
+                    "default": 100
+                },
             },
             "required": ["start_date", "end_date"],
         },
@@ -729,8 +1649,11 @@ get_sales_orders_tool = {
 }
 
 
+@json_tool
+@cached_tool()
 def list_quotations(
     customer=None,
+    contains=False,
     quotation_to=None,
     status=None,
     start_date=None,
@@ -742,7 +1665,8 @@ def list_quotations(
     sort_by="transaction_date",
     sort_order="desc",
     limit=100,
-    offset=0
+    offset=0,
+    cursor=None
 ):
     """
     List quotations with advanced filtering and sorting options
@@ -751,82 +1675,24 @@ def list_quotations(
 
     # Apply filters
     if customer:
-        filters['party_name'] = ['like', f'%{customer}%']
+        filters['party_name'] = name_filter(customer, contains)
     if quotation_to:
         filters['quotation_to'] = quotation_to  # 'Customer' or 'Lead'
     if status:
         filters['status'] = status  # Draft, Submitted, Ordered, Lost, Cancelled, Expired
 
     # Transaction date filters
-    if start_date and end_date:
-        filters['transaction_date'] = ['between', [start_date, end_date]]
-    elif start_date:
-        filters['transaction_date'] = ['>=', start_date]
-    elif end_date:
-        filters['transaction_date'] = ['<=', end_date]
+    date_conditions = date_range('transaction_date', start_date, end_date)
 
     # Valid till date filters
-    if valid_till_start and valid_till_end:
-        filters['valid_till'] = ['between', [valid_till_start, valid_till_end]]
-    elif valid_till_start:
-        filters['valid_till'] = ['>=', valid_till_start]
-    elif valid_till_end:
-        filters['valid_till'] = ['<=', valid_till_end]
+    date_conditions += date_range('valid_till', valid_till_start, valid_till_end)
 
     # Amount filters
-    if min_amount and max_amount:
-        filters['grand_total'] = ['between', [min_amount, max_amount]]
-    elif min_amount:
-        filters['grand_total'] = ['>=', min_amount]
-    elif max_amount:
-        filters['grand_total'] = ['<=', max_amount]
-
-    # Validate sort_by field
-    valid_sort_fields = ['name', 'transaction_date', 'valid_till', 'grand_total',
-                        'status', 'party_name', 'creation', 'modified']
-    if sort_by not in valid_sort_fields:
-        sort_by = 'transaction_date'
-
-    # Build order_by clause
-    order_by = f'{sort_by} {sort_order}'
+    amount_range = value_range(min_amount, max_amount)
+    if amount_range:
+        filters['grand_total'] = amount_range
 
-    quotations = frappe.db.get_all(
-        'Quotation',
-        filters=filters,
-        fields=['name', 'quotation_to', 'party_name', 'customer_name',
-                'transaction_date', 'valid_till', 'grand_total', 'status',
-                'currency', 'order_type', 'creation', 'modified'],
-        order_by=order_by,
-        limit_start=offset,
-        limit_page_length=limit
-    )
-
-    # Get count for pagination
-    total_count = frappe.db.count('Quotation', filters=filters)
-
-    # Calculate summary statistics
-    if quotations:
-        total_amount = sum(q.get('grand_total', 0) for q in quotations)
-        average_amount = total_amount / len(quotations) if quotations else 0
-        summary = {
-            'total_quotations': len(quotations),
-            'total_amount': total_amount,
-            'average_amount': average_amount
-        }
-    else:
-        summary = {
-            'total_quotations': 0,
-            'total_amount': 0,
-            'average_amount': 0
-        }
-
-    return json.dumps({
-        'quotations': quotations,
-        'total_count': total_count,
-        'limit': limit,
-        'offset': offset,
-        'summary': summary
-    }, default=json_serial)
+    return list_documents('Quotation', filters, date_conditions, sort_by, sort_order, limit, offset, cursor)
 
 
 list_quotations_tool = {
@@ -839,7 +1705,12 @@ list_quotations_tool = {
             "properties": {
                 "customer": {
                     "type": "string",
-                    "description": "Filter by customer/lead name (partial match)",
+                    "description": "Filter by customer/lead name (matches the start of the name)",
+                },
+                "contains": {
+                    "type": "boolean",
+                    "description": "Match the name anywhere instead of only at the start (slower)",
+                    "default": False
                 },
                 "quotation_to": {
                     "type": "string",
@@ -892,6 +1763,10 @@ list_quotations_tool = {
                     "type": "integer",
                     "description": "Number of records to skip",
                     "default": 0
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page, to fetch the page after it (use instead of offset for deep pages)",
                 }
             },
             "required": [],
@@ -900,8 +1775,10 @@ list_quotations_tool = {
 }
 
 
+@json_tool
 def list_sales_orders(
     customer=None,
+    contains=False,
     status=None,
     delivery_status=None,
     billing_status=None,
@@ -914,7 +1791,9 @@ def list_sales_orders(
     sort_by="transaction_date",
     sort_order="desc",
     limit=100,
-    offset=0
+    offset=0,
+    cursor=None,
+    include_count=True
 ):
     """
     List sales orders with advanced filtering and sorting options
@@ -923,7 +1802,7 @@ def list_sales_orders(
 
     # Apply filters
     if customer:
-        filters['customer'] = ['like', f'%{customer}%']
+        filters['customer'] = name_filter(customer, contains)
     if status:
         filters['status'] = status  # Draft, To Deliver and Bill, To Bill, To Deliver, Completed, Cancelled, Closed
     if delivery_status:
@@ -932,83 +1811,20 @@ def list_sales_orders(
         filters['billing_status'] = billing_status  # Not Billed, Fully Billed, Partly Billed, Closed
 
     # Transaction date filters
-    if start_date and end_date:
-        filters['transaction_date'] = ['between', [start_date, end_date]]
-    elif start_date:
-        filters['transaction_date'] = ['>=', start_date]
-    elif end_date:
-        filters['transaction_date'] = ['<=', end_date]
+    date_conditions = date_range('transaction_date', start_date, end_date)
 
     # Delivery date filters
-    if delivery_date_start and delivery_date_end:
-        filters['delivery_date'] = ['between', [delivery_date_start, delivery_date_end]]
-    elif delivery_date_start:
-        filters['delivery_date'] = ['>=', delivery_date_start]
-    elif delivery_date_end:
-        filters['delivery_date'] = ['<=', delivery_date_end]
+    date_conditions += date_range('delivery_date', delivery_date_start, delivery_date_end)
 
     # Amount filters
-    if min_amount and max_amount:
-        filters['grand_total'] = ['between', [min_amount, max_amount]]
-    elif min_amount:
-        filters['grand_total'] = ['>=', min_amount]
-    elif max_amount:
-        filters['grand_total'] = ['<=', max_amount]
-
-    # Validate sort_by field
-    valid_sort_fields = ['name', 'transaction_date', 'delivery_date', 'grand_total',
-                        'status', 'customer', 'per_delivered', 'per_billed', 'creation', 'modified']
-    if sort_by not in valid_sort_fields:
-        sort_by = 'transaction_date'
-
-    # Build order_by clause
-    order_by = f'{sort_by} {sort_order}'
+    amount_range = value_range(min_amount, max_amount)
+    if amount_range:
+        filters['grand_total'] = amount_range
 
-    sales_orders = frappe.db.get_all(
-        'Sales Order',
-        filters=filters,
-        fields=['name', 'customer', 'customer_name', 'transaction_date', 'delivery_date',
-                'grand_total', 'status', 'delivery_status', 'billing_status',
-                'per_delivered', 'per_billed', 'currency', 'order_type',
-                'creation', 'modified'],
-        order_by=order_by,
-        limit_start=offset,
-        limit_page_length=limit
+    return list_documents(
+        'Sales Order', filters, date_conditions, sort_by, sort_order, limit, offset, cursor, include_count
     )
 
-    # Get count for pagination
-    total_count = frappe.db.count('Sales Order', filters=filters)
-
-    # Calculate summary statistics
-    if sales_orders:
-        total_amount = sum(so.get('grand_total', 0) for so in sales_orders)
-        average_amount = total_amount / len(sales_orders) if sales_orders else 0
-        avg_delivery = sum(so.get('per_delivered', 0) for so in sales_orders) / len(sales_orders)
-        avg_billed = sum(so.get('per_billed', 0) for so in sales_orders) / len(sales_orders)
-        summary = {
-            'total_orders': len(sales_orders),
-            'total_amount': total_amount,
-            'average_amount': average_amount,
-            'average_delivery_percentage': avg_delivery,
-            'average_billing_percentage': avg_billed
-        }
-    else:
-        summary = {
-            'total_orders': 0,
-            'total_amount': 0,
-            'average_amount': 0,
-            'average_delivery_percentage': 0,
-            'average_billing_percentage': 0
-        }
-
-    return json.dumps({
-        'sales_orders': sales_orders,
-        'total_count': total_count,
-        'limit': limit,
-        'offset': offset,
-        'summary': summary
-    }, default=json_serial)
-
 
 list_sales_orders_tool = {
     "type": "function",
@@ -1020,7 +1836,12 @@ list_sales_orders_tool = {
             "properties": {
                 "customer": {
                     "type": "string",
-                    "description": "Filter by customer name (partial match)",
+                    "description": "Filter by customer name (matches the start of the name)",
+                },
+                "contains": {
+                    "type": "boolean",
+                    "description": "Match the name anywhere instead of only at the start (slower)",
+                    "default": False
                 },
                 "status": {
                     "type": "string",
@@ -1077,6 +1898,15 @@ list_sales_orders_tool = {
                     "type": "integer",
                     "description": "Number of records to skip",
                     "default": 0
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page, to fetch the page after it (use instead of offset for deep pages)",
+                },
+                "include_count": {
+                    "type": "boolean",
+                    "description": "Also return total_count and summary totals over all matching records (set false when only this page is needed)",
+                    "default": True
                 }
             },
             "required": [],
@@ -1085,6 +1915,7 @@ list_sales_orders_tool = {
 }
 
 
+@json_tool
 def get_delivery_note(delivery_note_number):
     """
     Get complete details of a specific delivery note including all line items and serial numbers
@@ -1093,18 +1924,18 @@ def get_delivery_note(delivery_note_number):
     delivery_note = frappe.db.get_value(
         'Delivery Note',
         delivery_note_number,
-        ['*'],
+        list(FIELDS['Delivery Note Detail']),
         as_dict=True
     )
 
     if not delivery_note:
-        return json.dumps({'error': f'Delivery Note {delivery_note_number} not found'}, default=json_serial)
+        return {'error': f'Delivery Note {delivery_note_number} not found'}
 
     # Get all line items
     items = frappe.db.get_all(
         'Delivery Note Item',
         filters={'parent': delivery_note_number},
-        fields=['*']
+        fields=list(FIELDS['Delivery Note Item'])
     )
 
     # Collect all serial numbers
@@ -1175,7 +2006,7 @@ def get_delivery_note(delivery_note_number):
         all_serials.extend([s['serial_no'] for s in item_serials])
     delivery_note['all_serial_numbers'] = list(set(all_serials))
 
-    return json.dumps(delivery_note, default=json_serial)
+    return delivery_note
 
 
 get_delivery_note_tool = {
@@ -1197,8 +2028,10 @@ get_delivery_note_tool = {
 }
 
 
+@json_tool
 def list_delivery_notes(
     customer=None,
+    contains=False,
     status=None,
     serial_number=None,
     item_code=None,
@@ -1209,111 +2042,72 @@ def list_delivery_notes(
     sort_by="posting_date",
     sort_order="desc",
     limit=100,
-    offset=0
+    offset=0,
+    cursor=None,
+    include_count=True
 ):
     """
     List delivery notes with advanced filtering, sorting options, and serial number search
     """
+    limit = get_row_limit(limit)
     filters = {}
 
     # Log query parameters for debugging
-    logger.debug(f"list_delivery_notes called with: serial_number={serial_number}, start_date={start_date}, end_date={end_date}, limit={limit}")
+    logger.debug("list_delivery_notes called with: serial_number=%s, start_date=%s, end_date=%s, limit=%s", serial_number, start_date, end_date, limit)
 
-    # Handle serial number search - first find Serial and Batch Bundle, then filter
-    serial_number_note_names = None  # Track delivery notes found via serial number
+    # Handle serial number search: find the delivery notes whose Stock Ledger Entries (the
+    # authoritative source for serial tracking) carry a bundle containing the serial number,
+    # and the item too when item_code is given, in one join
     if serial_number:
-        # Step 1: Find Serial and Batch Bundle containing the serial number
-        serial_bundles = frappe.db.get_all(
-            'Serial and Batch Entry',
-            filters={
-                'serial_no': ['like', f'%{serial_number}%']
-            },
-            fields=['parent'],
-            distinct=True
+        StockLedgerEntry = DocType('Stock Ledger Entry')
+        SerialBatchEntry = DocType('Serial and Batch Entry')
+
+        query = (
+            frappe.qb.from_(StockLedgerEntry)
+            .join(SerialBatchEntry)
+            .on(SerialBatchEntry.parent == StockLedgerEntry.serial_and_batch_bundle)
+            .select(StockLedgerEntry.voucher_no)
+            .distinct()
+            .where(StockLedgerEntry.voucher_type == 'Delivery Note')
+            .where(SerialBatchEntry.serial_no.like(f'%{serial_number}%'))
         )
+        if item_code:
+            query = query.where(StockLedgerEntry.item_code == item_code)
+        note_names = [row[0] for row in query.run()]
 
-        logger.debug(f"Found {len(serial_bundles) if serial_bundles else 0} serial bundles for serial {serial_number}")
-
-        if serial_bundles:
-            # Extract bundle names
-            bundle_names = [bundle.parent for bundle in serial_bundles]
-
-            # Step 2: Find delivery notes containing these bundles
-            # Use Stock Ledger Entry as the authoritative source for serial tracking
-            stock_ledger_entries = frappe.db.get_all(
-                'Stock Ledger Entry',
-                filters={
-                    'serial_and_batch_bundle': ['in', bundle_names],
-                    'voucher_type': 'Delivery Note'
-                },
-                fields=['voucher_no'],
-                distinct=True
-            )
-
-            # Extract delivery note names from stock ledger entries
-            note_names = [entry.voucher_no for entry in stock_ledger_entries] if stock_ledger_entries else []
-
-            logger.debug(f"Found {len(note_names)} delivery notes with serial {serial_number} via Stock Ledger Entry")
+        logger.debug("Found %s delivery notes with serial %s via Stock Ledger Entry", len(note_names), serial_number)
 
-            if note_names:
-                serial_number_note_names = note_names  # Store for later use
-                filters['name'] = ['in', note_names]
-                logger.debug(f"Delivery notes with serial {serial_number}: {note_names}")
-            else:
-                # No delivery notes found with this serial number
-                return json.dumps({
-                    'delivery_notes': [],
-                    'total_count': 0,
-                    'limit': limit,
-                    'offset': offset,
-                    'summary': {
-                        'total_notes': 0,
-                        'total_amount': 0,
-                        'average_amount': 0
-                    }
-                }, default=json_serial)
+        if note_names:
+            filters['name'] = ['in', note_names]
+            logger.debug("Delivery notes with serial %s: %s", serial_number, note_names)
         else:
-            # No serial bundles found with this serial number
-            return json.dumps({
-                'delivery_notes': [],
-                'total_count': 0,
-                'limit': limit,
-                'offset': offset,
-                'summary': {
-                    'total_notes': 0,
-                    'total_amount': 0,
-                    'average_amount': 0
-                }
-            }, default=json_serial)
+            # No delivery notes found with this serial number
+            return delivery_note_result([], limit, offset, include_count=include_count)
 
     # Apply other filters
     if customer:
-        filters['customer'] = ['like', f'%{customer}%']
+        filters['customer'] = name_filter(customer, contains)
     if status:
         filters['status'] = status  # Draft, To Bill, Completed, Cancelled, Closed
     if lr_no:
-        filters['lr_no'] = ['like', f'%{lr_no}%']
+        filters['lr_no'] = name_filter(lr_no, contains)
     if transporter:
-        filters['transporter'] = ['like', f'%{transporter}%']
+        filters['transporter'] = name_filter(transporter, contains)
 
     # Date filters - only apply if no serial number search OR if explicitly requested
     # When searching by serial number, we want ALL matching delivery notes regardless of date
     # unless the user explicitly provides date filters
     if not serial_number:
         # Apply date filters normally when not searching by serial number
-        if start_date and end_date:
-            filters['posting_date'] = ['between', [start_date, end_date]]
-        elif start_date:
-            filters['posting_date'] = ['>=', start_date]
-        elif end_date:
-            filters['posting_date'] = ['<=', end_date]
+        date_conditions = date_range('posting_date', start_date, end_date)
     else:
         # For serial number searches, only apply date filters if explicitly provided by user
         # This prevents implicit date filtering that might exclude recent delivery notes
-        logger.debug(f"Serial number search - date filters ignored to ensure all matching notes are found")
+        date_conditions = []
+        logger.debug("Serial number search - date filters ignored to ensure all matching notes are found")
 
     # Item code filter - using Frappe database API
-    if item_code and not serial_number:  # If serial_number is already filtered, skip item_code
+    if item_code and not serial_number:  # The serial number join already filters on item_code
         item_filter_notes = frappe.db.get_all(
             'Delivery Note Item',
             filters={'item_code': item_code},
@@ -1322,141 +2116,104 @@ def list_delivery_notes(
         )
 
         if item_filter_notes:
-            item_note_names = [note.parent for note in item_filter_notes]
-            if 'name' in filters:
-                # Intersect with existing name filter
-                existing_names = filters['name'][1]
-                filters['name'] = ['in', list(set(existing_names) & set(item_note_names))]
-            else:
-                filters['name'] = ['in', item_note_names]
+            filters['name'] = ['in', [note.parent for note in item_filter_notes]]
         else:
             # No delivery notes found with this item
-            return json.dumps({
-                'delivery_notes': [],
-                'total_count': 0,
-                'limit': limit,
-                'offset': offset,
-                'summary': {
-                    'total_notes': 0,
-                    'total_amount': 0,
-                    'average_amount': 0
-                }
-            }, default=json_serial)
+            return delivery_note_result([], limit, offset, include_count=include_count)
+
+    filters = with_conditions(filters, date_conditions)
 
     # Validate sort_by field
-    valid_sort_fields = ['name', 'posting_date', 'customer', 'grand_total',
-                        'status', 'per_billed', 'creation', 'modified']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['Delivery Note List']:
         sort_by = 'posting_date'
 
-    # Build order_by clause
-    order_by = f'{sort_by} {sort_order}'
-
     # Log the final filters being applied
-    logger.debug(f"Final filters for delivery notes query: {filters}")
-    logger.debug(f"Sort: {order_by}, Limit: {limit}, Offset: {offset}")
-
-    # When searching by serial number with limit=1, we need to ensure proper ordering
-    # The issue is that frappe.db.get_all with 'name IN [...]' filter may not respect order_by correctly
-    # So we need to fetch all matching records first, then sort and limit in Python
-    if serial_number and limit == 1 and serial_number_note_names:
-        # Fetch all delivery notes matching the serial number without limit
-        all_matching_notes = frappe.db.get_all(
-            'Delivery Note',
-            filters=filters,
-            fields=['name', 'customer', 'customer_name', 'posting_date',
-                    'grand_total', 'status', 'per_billed', 'currency',
-                    'lr_no', 'lr_date', 'transporter', 'vehicle_no',
-                    'is_return', 'creation', 'modified'],
-            order_by=order_by
-        )
-
-        logger.debug(f"Found {len(all_matching_notes)} total delivery notes for serial {serial_number}")
-        for note in all_matching_notes[:3]:  # Log first 3 for debugging
-            logger.debug(f"  - {note['name']}: {note['posting_date']}")
+    logger.debug("Final filters for delivery notes query: %s", filters)
+    logger.debug("Sort: %s %s, Limit: %s, Offset: %s", sort_by, sort_order, limit, offset)
 
-        # Apply offset and limit manually
-        delivery_notes = all_matching_notes[offset:offset + limit]
-    else:
-        delivery_notes = frappe.db.get_all(
-            'Delivery Note',
-            filters=filters,
-            fields=['name', 'customer', 'customer_name', 'posting_date',
-                    'grand_total', 'status', 'per_billed', 'currency',
-                    'lr_no', 'lr_date', 'transporter', 'vehicle_no',
-                    'is_return', 'creation', 'modified'],
-            order_by=order_by,
-            limit_start=offset,
-            limit_page_length=limit
+    # The IN filter from a serial number search does not change the ordering: the page is
+    # sorted by sort_by (then name) in SQL like any other
+    try:
+        delivery_notes, next_cursor = get_page(
+            'Delivery Note', filters, list(FIELDS['Delivery Note List']),
+            sort_by, sort_order, limit, offset, cursor
         )
+    except ValueError:
+        return {"error": "Invalid cursor. Pass the next_cursor of the previous page."}
 
-    logger.debug(f"Query returned {len(delivery_notes) if delivery_notes else 0} delivery notes")
+    logger.debug("Query returned %s delivery notes", len(delivery_notes) if delivery_notes else 0)
     if delivery_notes and serial_number:
-        logger.debug(f"Top result: {delivery_notes[0]['name']} dated {delivery_notes[0]['posting_date']}")
+        logger.debug("Top result: %s dated %s", delivery_notes[0]['name'], delivery_notes[0]['posting_date'])
 
     # If serial number was searched, add serial number info to results
     if serial_number and delivery_notes:
+        DeliveryNoteItem = DocType('Delivery Note Item')
+        SerialBatchEntry = DocType('Serial and Batch Entry')
+
+        # One JOIN for the whole page instead of an item and a serial lookup per note
+        rows = (
+            frappe.qb.from_(DeliveryNoteItem)
+            .join(SerialBatchEntry)
+            .on(SerialBatchEntry.parent == DeliveryNoteItem.serial_and_batch_bundle)
+            .select(
+                DeliveryNoteItem.name,
+                DeliveryNoteItem.parent,
+                DeliveryNoteItem.item_code,
+                DeliveryNoteItem.item_name,
+                DeliveryNoteItem.serial_and_batch_bundle,
+                DeliveryNoteItem.qty,
+                SerialBatchEntry.serial_no,
+            )
+            .where(DeliveryNoteItem.parent.isin([note['name'] for note in delivery_notes]))
+            .where(SerialBatchEntry.serial_no.like(f'%{serial_number}%'))
+            .orderby(DeliveryNoteItem.parent)
+            .orderby(DeliveryNoteItem.idx)
+        ).run(as_dict=True)
+
+        matched_items = {}
+        for row in rows:
+            item = matched_items.setdefault(row.pop('name'), {
+                'parent': row['parent'],
+                'item_code': row['item_code'],
+                'item_name': row['item_name'],
+                'serial_and_batch_bundle': row['serial_and_batch_bundle'],
+                'qty': row['qty'],
+                'serial_numbers': [],
+            })
+            item['serial_numbers'].append(row['serial_no'])
+
+        items_by_note = {}
+        for item in matched_items.values():
+            item['serial_numbers'] = ', '.join(item['serial_numbers'])
+            items_by_note.setdefault(item.pop('parent'), []).append(item)
+
         for note in delivery_notes:
-            # Get items with the matching serial and batch bundle using Frappe Query Builder
-            from frappe.query_builder import DocType
+            note['matched_serial_items'] = items_by_note.get(note['name'], [])
 
-            DeliveryNoteItem = DocType('Delivery Note Item')
-            SerialBatchEntry = DocType('Serial and Batch Entry')
+    return delivery_note_result(delivery_notes, limit, offset, next_cursor, filters, include_count)
 
-            # Get delivery note items with their bundles
-            items = frappe.db.get_all(
-                'Delivery Note Item',
-                filters={'parent': note['name']},
-                fields=['item_code', 'item_name', 'serial_and_batch_bundle', 'qty']
-            )
 
-            matched_items = []
-            for item in items:
-                if item.serial_and_batch_bundle:
-                    # Get serial numbers from the bundle
-                    serials = frappe.db.get_all(
-                        'Serial and Batch Entry',
-                        filters={
-                            'parent': item.serial_and_batch_bundle,
-                            'serial_no': ['like', f'%{serial_number}%']
-                        },
-                        fields=['serial_no']
-                    )
-                    if serials:
-                        item['serial_numbers'] = ', '.join([s.serial_no for s in serials])
-                        matched_items.append(item)
-
-            note['matched_serial_items'] = matched_items
-
-    # Get count for pagination
-    total_count = frappe.db.count('Delivery Note', filters=filters)
-
-    # Calculate summary statistics
-    if delivery_notes:
-        total_amount = sum(dn.get('grand_total', 0) for dn in delivery_notes)
-        average_amount = total_amount / len(delivery_notes) if delivery_notes else 0
-        avg_billed = sum(dn.get('per_billed', 0) for dn in delivery_notes) / len(delivery_notes)
-        summary = {
-            'total_notes': len(delivery_notes),
-            'total_amount': total_amount,
-            'average_amount': average_amount,
-            'average_billing_percentage': avg_billed
-        }
-    else:
-        summary = {
-            'total_notes': 0,
-            'total_amount': 0,
-            'average_amount': 0,
-            'average_billing_percentage': 0
-        }
+def delivery_note_result(delivery_notes, limit, offset, next_cursor=None, filters=None, include_count=True):
+    """
+    The result of list_delivery_notes, with the same keys whether or not anything matched.
+    Totals cover every note matching filters, not just this page; without filters (nothing
+    matched) they are zero. The count doubles as total_count.
+    """
+    summary = None
+    if include_count:
+        if filters is None:
+            summary = dict.fromkeys(DELIVERY_NOTE_SUMMARY, 0)
+        else:
+            summary = get_cached_totals('Delivery Note', filters, DELIVERY_NOTE_SUMMARY)
 
-    return json.dumps({
+    return {
         'delivery_notes': delivery_notes,
-        'total_count': total_count,
+        'total_count': summary['total_notes'] if summary else None,
         'limit': limit,
         'offset': offset,
+        'next_cursor': next_cursor,
         'summary': summary
-    }, default=json_serial)
+    }
 
 
 list_delivery_notes_tool = {
@@ -1469,7 +2226,12 @@ list_delivery_notes_tool = {
             "properties": {
                 "customer": {
                     "type": "string",
-                    "description": "Filter by customer name (partial match)",
+                    "description": "Filter by customer name (matches the start of the name)",
+                },
+                "contains": {
+                    "type": "boolean",
+                    "description": "Match customer, lr_no and transporter anywhere instead of only at the start (slower)",
+                    "default": False
                 },
                 "status": {
                     "type": "string",
@@ -1493,11 +2255,11 @@ list_delivery_notes_tool = {
                 },
                 "lr_no": {
                     "type": "string",
-                    "description": "Filter by Lorry Receipt Number / Tracking Number (partial match)",
+                    "description": "Filter by Lorry Receipt Number / Tracking Number (matches the start)",
                 },
                 "transporter": {
                     "type": "string",
-                    "description": "Filter by transporter name (partial match)",
+                    "description": "Filter by transporter name (matches the start of the name)",
                 },
                 "sort_by": {
                     "type": "string",
@@ -1518,6 +2280,15 @@ list_delivery_notes_tool = {
                     "type": "integer",
                     "description": "Number of records to skip",
                     "default": 0
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from the previous page, to fetch the page after it (use instead of offset for deep pages)",
+                },
+                "include_count": {
+                    "type": "boolean",
+                    "description": "Also return total_count and summary totals over all matching records (set false when only this page is needed)",
+                    "default": True
                 }
             },
             "required": [],
@@ -1526,19 +2297,9 @@ list_delivery_notes_tool = {
 }
 
 
-def get_purchase_invoices(start_date=None, end_date=None, supplier=None):
-    filters = {}
-    if start_date and end_date:
-        filters['posting_date'] = ['between', [start_date, end_date]]
-    if supplier:
-        filters['supplier'] = supplier
-
-    purchase_invoices = frappe.db.get_all(
-        'Purchase Invoice',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(purchase_invoices, default=json_serial)
+@json_tool
+def get_purchase_invoices(start_date=None, end_date=None, supplier=None, limit=None):
+    return run_list_tool('get_purchase_invoices', limit, start_date, end_date, supplier=supplier)
 
 
 
@@ -1562,6 +2323,11 @@ get_purchase_invoices_tool = {
                     "type": "string",
                     "description": "Supplier name",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
             },
             "required": ["start_date", "end_date"],
         },
@@ -1569,17 +2335,9 @@ get_purchase_invoices_tool = {
 }
 
 
-def get_journal_entries(start_date=None, end_date=None):
-    filters = {}
-    if start_date and end_date:
-        filters['posting_date'] = ['between', [start_date, end_date]]
-
-    journal_entries = frappe.db.get_all(
-        'Journal Entry',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(journal_entries, default=json_serial)
+@json_tool
+def get_journal_entries(start_date=None, end_date=None, limit=None):
+    return run_list_tool('get_journal_entries', limit, start_date, end_date)
 
 
 get_journal_entries_tool = {
@@ -1598,6 +2356,11 @@ get_journal_entries_tool = {
                     "type": "string",
                     "description": "End date in YYYY-MM-DD format",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
             },
             "required": ["start_date", "end_date"],
         },
@@ -1605,19 +2368,9 @@ get_journal_entries_tool = {
 }
 
 
-def get_payments(start_date=None, end_date=None, payment_type=None):
-    filters = {}
-    if start_date and end_date:
-        filters['posting_date'] = ['between', [start_date, end_date]]
-    if payment_type:
-        filters['payment_type'] = payment_type
-
-    payment_entries = frappe.db.get_all(
-        'Payment Entry',
-        filters=filters,
-        fields=['*']
-    )
-    return json.dumps(payment_entries, default=json_serial)
+@json_tool
+def get_payments(start_date=None, end_date=None, payment_type=None, limit=None):
+    return run_list_tool('get_payments', limit, start_date, end_date, payment_type=payment_type)
 
 
 get_payments_tool = {
@@ -1640,6 +2393,11 @@ get_payments_tool = {
                     "type": "string",
                     "description": "Payment type (e.g., Receive, Pay)",
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of records to return",
+                    "default": 100
+                },
             },
             "required": ["start_date", "end_date"],
         },
@@ -1647,6 +2405,7 @@ get_payments_tool = {
 }
 
 
+@json_tool
 def list_service_protocols(
     customer=None,
     status=None,
@@ -1661,11 +2420,9 @@ def list_service_protocols(
     """
     List Service Protocols with filtering, sorting, and pagination.
     Can filter by customer, status, date range, or serial number in devices.
+    The summary covers every matching protocol, not just this page.
     """
-    import frappe
-    import json
-    from datetime import datetime
-
+    limit = get_row_limit(limit)
     filters = {}
 
     # Add basic filters
@@ -1680,12 +2437,7 @@ def list_service_protocols(
         }.get(status, 0)
 
     # Date range filter
-    if date_from and date_to:
-        filters['date_of_service'] = ['between', [date_from, date_to]]
-    elif date_from:
-        filters['date_of_service'] = ['>=', date_from]
-    elif date_to:
-        filters['date_of_service'] = ['<=', date_to]
+    date_conditions = date_range('date_of_service', date_from, date_to)
 
     # Handle serial number search in child table
     if serial_number:
@@ -1702,17 +2454,18 @@ def list_service_protocols(
             filters['name'] = ['in', protocol_names]
         else:
             # No protocols found with this serial number
-            return json.dumps({
+            return {
                 'service_protocols': [],
                 'total_count': 0,
                 'limit': limit,
                 'offset': offset,
-                'summary': {}
-            }, default=json_serial)
+                'summary': service_protocol_summary(None)
+            }
+
+    filters = with_conditions(filters, date_conditions)
 
     # Validate sort_by field
-    valid_sort_fields = ['name', 'customer', 'date_of_service', 'creation', 'modified']
-    if sort_by not in valid_sort_fields:
+    if sort_by not in SORT_FIELDS['Service Protocol List']:
         sort_by = 'date_of_service'
 
     # Build order by clause
@@ -1722,55 +2475,71 @@ def list_service_protocols(
     service_protocols = frappe.db.get_all(
         'Service Protocol',
         filters=filters,
-        fields=['name', 'customer', 'date_of_service', 'notes', 'docstatus',
-                'creation', 'modified', 'owner'],
+        fields=list(FIELDS['Service Protocol List']),
         order_by=order_by,
         limit=limit,
         start=offset
     )
 
-    # Add customer name and status for each protocol
+    # Customer names and device counts for the whole page, fetched as (key, value) tuples
+    # in one query each rather than two lookups per protocol
+    customers = list({protocol['customer'] for protocol in service_protocols if protocol['customer']})
+    customer_names = dict(frappe.db.get_all(
+        'Customer',
+        filters={'name': ['in', customers]},
+        fields=['name', 'customer_name'],
+        as_list=True
+    )) if customers else {}
+    device_counts = dict(frappe.db.get_all(
+        'Service Protocol Item',
+        filters={'parent': ['in', [protocol['name'] for protocol in service_protocols]]},
+        fields=['parent', 'count(name) as device_count'],
+        group_by='parent',
+        as_list=True
+    )) if service_protocols else {}
+
+    # Add customer name, status and device count for each protocol
     for protocol in service_protocols:
-        # Get customer name
-        if protocol.get('customer'):
-            customer_name = frappe.db.get_value('Customer', protocol['customer'], 'customer_name')
-            protocol['customer_name'] = customer_name
+        if protocol['customer']:
+            protocol['customer_name'] = customer_names.get(protocol['customer'])
 
         # Add human-readable status
         protocol['status'] = {
             0: 'Draft',
             1: 'Submitted',
             2: 'Cancelled'
-        }.get(protocol.get('docstatus', 0), 'Draft')
-
-        # Get device count
-        device_count = frappe.db.count('Service Protocol Item', {'parent': protocol['name']})
-        protocol['device_count'] = device_count
-
-    # Get total count for pagination
-    total_count = frappe.db.count('Service Protocol', filters=filters)
-
-    # Calculate summary statistics
-    summary = {}
-    if service_protocols:
-        summary = {
-            'total_protocols': len(service_protocols),
-            'total_devices_serviced': sum(p.get('device_count', 0) for p in service_protocols),
-            'date_range': {
-                'earliest': min(p['date_of_service'] for p in service_protocols if p.get('date_of_service')),
-                'latest': max(p['date_of_service'] for p in service_protocols if p.get('date_of_service'))
-            } if any(p.get('date_of_service') for p in service_protocols) else None
-        }
+        }.get(protocol['docstatus'], 'Draft')
 
-    return json.dumps({
+        protocol['device_count'] = device_counts.get(protocol['name'], 0)
+
+    summary = service_protocol_summary(filters)
+
+    return {
         'service_protocols': service_protocols,
-        'total_count': total_count,
+        'total_count': summary['total_protocols'],
         'limit': limit,
         'offset': offset,
         'summary': summary
-    }, default=json_serial)
+    }
 
 
+def service_protocol_summary(filters):
+    """
+    Summary of list_service_protocols over every protocol matching filters, in one query.
+    Without filters (nothing matched) the totals are zero.
+    """
+    totals = get_totals('Service Protocol', filters, SERVICE_PROTOCOL_SUMMARY) if filters is not None else {}
+    return {
+        'total_protocols': totals.get('total_protocols', 0),
+        'total_devices_serviced': totals.get('total_devices_serviced', 0),
+        'date_range': {
+            'earliest': totals['earliest'],
+            'latest': totals['latest']
+        } if totals.get('earliest') else None
+    }
+
+
+@json_tool
 def create_lead(
     organization_name=None,
     first_name=None,
@@ -1786,9 +2555,9 @@ def create_lead(
     try:
         # Validate required fields
         if not organization_name and not (first_name and last_name):
-            return json.dumps({
+            return {
                 'error': 'Either organization_name OR (first_name AND last_name) is required'
-            }, default=json_serial)
+            }
 
         # Prepare lead data
         lead_data = {
@@ -1926,10 +2695,10 @@ def create_lead(
         frappe.db.commit()
 
         # Log the creation
-        logger.debug(f"Created lead: {lead_doc.name} for {lead_data['lead_name']}")
+        logger.debug("Created lead: %s for %s", lead_doc.name, lead_data['lead_name'])
 
         # Return the created lead details
-        return json.dumps({
+        return {
             'success': True,
             'lead_id': lead_doc.name,
             'lead_name': lead_doc.lead_name,
@@ -1939,20 +2708,20 @@ def create_lead(
             'country': lead_doc.country if hasattr(lead_doc, 'country') else None,
             'status': lead_doc.status,
             'message': f"Lead {lead_doc.name} created successfully"
-        }, default=json_serial)
+        }
 
     except frappe.exceptions.ValidationError as e:
-        logger.error(f"Validation error creating lead: {str(e)}")
-        return json.dumps({
+        logger.error("Validation error creating lead: %s", e)
+        return {
             'error': f"Validation error: {str(e)}",
             'success': False
-        }, default=json_serial)
+        }
     except Exception as e:
         frappe.log_error(f"Error creating lead: {str(e)}", "Lead Creation Error")
-        return json.dumps({
+        return {
             'error': str(e),
             'success': False
-        }, default=json_serial)
+        }
 
 
 create_lead_tool = {
@@ -1994,12 +2763,12 @@ create_lead_tool = {
 }
 
 
+@json_tool
 def get_service_protocol(protocol_name):
     """
     Get detailed information about a specific Service Protocol including all devices.
     """
     import frappe
-    import json
 
     # Get main protocol document
     protocol = frappe.db.get_value(
@@ -2011,7 +2780,7 @@ def get_service_protocol(protocol_name):
     )
 
     if not protocol:
-        return json.dumps({'error': f'Service Protocol {protocol_name} not found'})
+        return {'error': f'Service Protocol {protocol_name} not found'}
 
     # Get customer details
     if protocol.get('customer'):
@@ -2070,7 +2839,7 @@ def get_service_protocol(protocol_name):
             else:
                 break
 
-    return json.dumps(protocol, default=json_serial)
+    return protocol
 
 
 # Tool definitions for Service Protocol
@@ -2146,35 +2915,52 @@ get_service_protocol_tool = {
 }
 
 
+# The tool schemas are static, so the list is built once at import time
+_TOOLS = [
+    get_sales_invoices_tool,
+    get_sales_totals_by_period_tool,
+    get_sales_invoice_tool,
+    list_invoices_tool,
+    get_employees_tool,
+    get_purchase_orders_tool,
+    get_customers_tool,
+    list_customers_tool,
+    get_stock_levels_tool,
+    get_general_ledger_entries_tool,
+    get_gl_totals_by_account_tool,
+    get_profit_and_loss_statement_tool,
+    get_outstanding_invoices_tool,
+    get_sales_orders_tool,
+    get_sales_overview_tool,
+    list_quotations_tool,
+    list_sales_orders_tool,
+    list_delivery_notes_tool,
+    get_delivery_note_tool,
+    get_purchase_invoices_tool,
+    get_journal_entries_tool,
+    get_payments_tool,
+    list_service_protocols_tool,
+    get_service_protocol_tool,
+    create_lead_tool,
+]
+
+
+# ...and serialized once, for consumers that need the JSON rather than the objects
+_TOOLS_JSON = orjson.dumps(_TOOLS)
+
+
 def get_tools():
-    return [
-        get_sales_invoices_tool,
-        get_sales_invoice_tool,
-        list_invoices_tool,
-        get_employees_tool,
-        get_purchase_orders_tool,
-        get_customers_tool,
-        list_customers_tool,
-        get_stock_levels_tool,
-        get_general_ledger_entries_tool,
-        get_profit_and_loss_statement_tool,
-        get_outstanding_invoices_tool,
-        get_sales_orders_tool,
-        list_quotations_tool,
-        list_sales_orders_tool,
-        list_delivery_notes_tool,
-        get_delivery_note_tool,
-        get_purchase_invoices_tool,
-        get_journal_entries_tool,
-        get_payments_tool,
-        list_service_protocols_tool,
-        get_service_protocol_tool,
-        create_lead_tool,
-    ]
+    return _TOOLS
+
+
+def get_tools_json():
+    """The tool schemas as JSON bytes."""
+    return _TOOLS_JSON
 
 
 available_functions = {
     "get_sales_invoices": get_sales_invoices,
+    "get_sales_totals_by_period": get_sales_totals_by_period,
     "get_sales_invoice": get_sales_invoice,
     "list_invoices": list_invoices,
     "get_employees": get_employees,
@@ -2183,9 +2969,11 @@ available_functions = {
     "list_customers": list_customers,
     "get_stock_levels": get_stock_levels,
     "get_general_ledger_entries": get_general_ledger_entries,
+    "get_gl_totals_by_account": get_gl_totals_by_account,
     "get_profit_and_loss_statement": get_profit_and_loss_statement,
     "get_outstanding_invoices": get_outstanding_invoices,
     "get_sales_orders": get_sales_orders,
+    "get_sales_overview": get_sales_overview,
     "list_quotations": list_quotations,
     "list_sales_orders": list_sales_orders,
     "list_delivery_notes": list_delivery_notes,
@@ -2197,3 +2985,42 @@ available_functions = {
     "get_service_protocol": get_service_protocol,
     "create_lead": create_lead,
 }
+
+# Tools that write to the database; every other tool only reads
+WRITE_TOOLS = frozenset({"create_lead"})
+
+# Reports over a date window, memoized by the chat dispatcher for DISPATCH_CACHE_TTL seconds.
+# Lookups of single documents and other current state stay fresh, apart from the tools that
+# are memoized themselves and invalidated through CACHED_TOOL_DOCTYPES.
+DISPATCH_CACHED_TOOLS = frozenset({
+    "get_sales_invoices",
+    "get_sales_totals_by_period",
+    "get_purchase_orders",
+    "get_general_ledger_entries",
+    "get_gl_totals_by_account",
+    "get_profit_and_loss_statement",
+    "get_sales_orders",
+    "get_sales_overview",
+    "get_purchase_invoices",
+    "get_journal_entries",
+    "get_payments",
+})
+
+
+def dispatch_function(name, function):
+    """The native-data form of a tool as the chat dispatcher calls it."""
+    function = function.raw
+    if name in WRITE_TOOLS:
+        return function
+    if name in DISPATCH_CACHED_TOOLS and not getattr(function, 'cached', False):
+        function = cached_tool(DISPATCH_CACHE_TTL)(function)
+    return frappe.read_only()(function)
+
+
+# The same tools returning native Python data, for the chat dispatcher.
+# Read-only tools go through frappe.read_only(), which runs them on the read replica when the
+# site sets read_from_replica, keeping the assistant's queries off the primary.
+available_functions_raw = {
+    name: dispatch_function(name, function)
+    for name, function in available_functions.items()
+}
@@ -18,4 +18,33 @@ doctype_js = {
     "OpenAI Settings": "public/js/openai_settings.js"
 }
 
-fixtures = [{"dt": "DocType", "filters": [["name", "in", ["OpenAI Settings"]]]}]
+# Drop memoized tool results when the data behind them changes. The DocTypes are the keys
+# of CACHED_TOOL_DOCTYPES in erpnext_chatgpt/tools.py; keep the two in step.
+# (Bin is also updated by direct SQL during stock postings; the cache TTL covers those)
+# Insert runs on_update too, so on_update and on_trash cover every save and delete.
+# Submittable DocTypes also change through submit, cancel and update after submit.
+_clear_tool_cache = "erpnext_chatgpt.erpnext_chatgpt.tools.clear_tool_cache"
+_tool_cache_doctypes = ("Employee", "Customer", "Bin")
+_submittable_tool_cache_doctypes = (
+    "Sales Invoice", "Purchase Invoice", "Payment Entry", "Journal Entry",
+    "Quotation", "Sales Order", "Delivery Note",
+)
+_tool_cache_events = ("on_update", "on_trash")
+_submit_events = ("on_submit", "on_cancel", "on_update_after_submit")
+
+doc_events = {
+    # Forget the cached system instructions and model settings when the settings are saved
+    "OpenAI Settings": {
+        "on_update": "erpnext_chatgpt.erpnext_chatgpt.api.clear_settings_caches",
+    },
+    **{
+        doctype: dict.fromkeys(_tool_cache_events, _clear_tool_cache)
+        for doctype in _tool_cache_doctypes
+    },
+    **{
+        doctype: dict.fromkeys(_tool_cache_events + _submit_events, _clear_tool_cache)
+        for doctype in _submittable_tool_cache_doctypes
+    },
+}
+
+fixtures = [{"dt": "DocType", "filters": [["name", "in", ["OpenAI Settings", "Chat Conversation"]]]}]
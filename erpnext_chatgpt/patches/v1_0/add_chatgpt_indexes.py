@@ -0,0 +1,25 @@
+import frappe
+
+# Composite indexes for the date range + party/account filters the assistant's tools run.
+# The range column leads so a single index serves both the date-only and the filtered queries.
+INDEXES = (
+    ("Sales Invoice", ["posting_date", "customer"]),
+    ("Purchase Invoice", ["posting_date", "supplier"]),
+    ("GL Entry", ["posting_date", "account"]),
+    ("Sales Order", ["transaction_date", "customer"]),
+    ("Purchase Order", ["transaction_date", "supplier"]),
+    ("Payment Entry", ["posting_date", "payment_type"]),
+)
+
+
+def execute():
+    add_indexes(INDEXES)
+
+
+def add_indexes(indexes):
+    """Add each (doctype, fields) index whose table exists. Shared by the later index patches."""
+    for doctype, fields in indexes:
+        if not frappe.db.table_exists(doctype):
+            continue
+        # add_index skips indexes that already exist, so the patch is safe to re-run
+        frappe.db.add_index(doctype, fields, index_name=f"idx_chatgpt_{'_'.join(fields)}")
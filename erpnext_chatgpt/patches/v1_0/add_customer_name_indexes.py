@@ -0,0 +1,15 @@
+import frappe
+
+# Index behind get_customers' default prefix match on customer_name. MariaDB only.
+
+
+def execute():
+    if frappe.db.db_type != "mariadb" or not frappe.db.table_exists("Customer"):
+        return
+
+    leading_index = frappe.db.sql(
+        """show index from `tabCustomer` where Column_name = 'customer_name' and Seq_in_index = 1
+        and Index_type = 'BTREE'"""
+    )
+    if not leading_index:
+        frappe.db.add_index("Customer", ["customer_name"])
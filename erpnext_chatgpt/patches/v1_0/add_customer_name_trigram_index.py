@@ -0,0 +1,23 @@
+import frappe
+
+# PostgreSQL only: a pg_trgm GIN index lets customer_name LIKE '%text%' (contains=True)
+# use an index instead of a sequential scan.
+TRIGRAM_INDEX = "idx_chatgpt_customer_name_trgm"
+
+
+def execute():
+    if frappe.db.db_type != "postgres" or not frappe.db.table_exists("Customer"):
+        return
+
+    try:
+        frappe.db.sql_ddl("create extension if not exists pg_trgm")
+        frappe.db.sql_ddl(
+            f'create index if not exists "{TRIGRAM_INDEX}" on "tabCustomer" '
+            "using gin (customer_name gin_trgm_ops)"
+        )
+    except Exception as e:
+        # A failed statement aborts the PostgreSQL transaction; roll back so the migration can go on
+        frappe.db.rollback()
+        # Creating the extension needs a privileged database role; substring search still
+        # works without the index, only slower
+        frappe.log_error(f"Could not create the customer_name trigram index: {e}", "OpenAI Migration")
@@ -0,0 +1,18 @@
+from erpnext_chatgpt.patches.v1_0.add_chatgpt_indexes import add_indexes
+
+# Composite indexes for the list_* tools' most common shape: an equality filter on status
+# (or the party) followed by the default sort column. With the equality column leading, the
+# database can read matching rows already in sort order and stop at the page limit instead
+# of sorting every match.
+INDEXES = (
+    ("Sales Invoice", ["status", "posting_date"]),
+    ("Purchase Invoice", ["status", "posting_date"]),
+    ("Quotation", ["status", "transaction_date"]),
+    ("Quotation", ["party_name", "transaction_date"]),
+    ("Sales Order", ["status", "transaction_date"]),
+    ("Delivery Note", ["status", "posting_date"]),
+)
+
+
+def execute():
+    add_indexes(INDEXES)
@@ -0,0 +1,13 @@
+from erpnext_chatgpt.patches.v1_0.add_chatgpt_indexes import add_indexes
+
+# Party counterparts of add_list_sort_indexes for list_delivery_notes and list_sales_orders,
+# which filter on customer and sort by date. An exact customer reads its rows already in date
+# order; a prefix match still narrows the scan to the matching range of the index.
+INDEXES = (
+    ("Delivery Note", ["customer", "posting_date"]),
+    ("Sales Order", ["customer", "transaction_date"]),
+)
+
+
+def execute():
+    add_indexes(INDEXES)
@@ -2,6 +2,8 @@
 document.addEventListener("DOMContentLoaded", initializeChat);
 
 let conversation = [];
+// Name of the server-side Chat Conversation holding the history
+let conversationId = localStorage.getItem("chatConversationId");
 
 async function initializeChat() {
   await loadMarkedJs();
@@ -137,7 +139,9 @@ window.handleAskButtonClick = function() {
 // Make clearConversation globally available
 window.clearConversation = function() {
   conversation = [];
+  conversationId = null;
   localStorage.removeItem("chatConversation");
+  localStorage.removeItem("chatConversationId");
   const answerDiv = document.getElementById("answer");
   if (answerDiv) {
     answerDiv.innerHTML = "";
@@ -220,14 +224,15 @@ async function askQuestion(question) {
 
   try {
     const response = await fetch(
-      "/api/method/erpnext_chatgpt.erpnext_chatgpt.api.ask_openai_question",
+      "/api/method/erpnext_chatgpt.erpnext_chatgpt.api.ask_openai_question_stream",
       {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           "X-Frappe-CSRF-Token": frappe.csrf_token,
         },
-        body: JSON.stringify({ conversation }),
+        // The server keeps the history; only send the new question
+        body: JSON.stringify({ conversation_id: conversationId, message: question }),
       }
     );
 
@@ -235,19 +240,45 @@ async function askQuestion(question) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
 
-    const data = await response.json();
-    console.log("API response:", data);
+    // Render the answer as it streams in
+    const assistantMessage = { role: "assistant", content: "", tool_usage: [] };
+    const messageElement = document.createElement("div");
+    messageElement.className = "alert alert-light";
+    document.getElementById("answer").appendChild(messageElement);
+
+    let renderPending = false;
+    const renderStreamingMessage = () => {
+      renderPending = false;
+      messageElement.innerHTML = renderMessageContent(assistantMessage.content);
+      scrollToBottom();
+    };
 
-    const parsedMessage = parseResponseMessage(data);
-    console.log("Parsed message with tool usage:", parsedMessage.tool_usage);
-    conversation.push({
-      role: "assistant",
-      content: parsedMessage.content,
-      tool_usage: parsedMessage.tool_usage
+    await readEventStream(response, (event) => {
+      if (event.error) {
+        throw new Error(event.error);
+      }
+      if (event.delta) {
+        assistantMessage.content += event.delta;
+        if (!renderPending) {
+          renderPending = true;
+          requestAnimationFrame(renderStreamingMessage);
+        }
+      }
+      if (event.tool_usage) {
+        assistantMessage.tool_usage = event.tool_usage;
+      }
+      if (event.conversation_id) {
+        conversationId = event.conversation_id;
+      }
     });
 
+    conversation.push(assistantMessage);
+
     // Save conversation to localStorage
     localStorage.setItem("chatConversation", JSON.stringify(conversation));
+    if (conversationId) {
+      localStorage.setItem("chatConversationId", conversationId);
+    }
     displayConversation(conversation);
   } catch (error) {
     console.error("Error in askQuestion:", error);
@@ -269,43 +300,31 @@ async function askQuestion(question) {
   }
 }
 
-function parseResponseMessage(response) {
-  // If the response is null or undefined, return an error message
-  if (response == null) {
-    return { content: "No response received.", tool_usage: [] };
-  }
-
-  // If the response is an object with a message property, use that
-  const message = response.message ?? response;
-
-  // Extract tool usage if present
-  const tool_usage = message.tool_usage || [];
-
-  // If the message is a string, return it directly
-  if (typeof message === "string") {
-    return { content: message, tool_usage: tool_usage };
-  }
-
-  // If the message is an object with a content property, return that
-  if (message && typeof message === "object" && "content" in message) {
-    return { content: message.content, tool_usage: tool_usage };
-  }
-
-  // If the message is an array, try to find a content item
-  if (Array.isArray(message)) {
-    const contentItem = message.find(
-      (item) =>
-        (Array.isArray(item) && item[0] === "content") ||
-        (item && typeof item === "object" && "content" in item)
-    );
-    if (contentItem) {
-      const content = Array.isArray(contentItem) ? contentItem[1] : contentItem.content;
-      return { content: content, tool_usage: tool_usage };
+async function readEventStream(response, onEvent) {
+  // Parse a text/event-stream body, calling onEvent with each JSON "data:" payload
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const data = rawEvent
+        .split("\n")
+        .filter((line) => line.startsWith("data: "))
+        .map((line) => line.slice(6))
+        .join("\n");
+      if (data) {
+        onEvent(JSON.parse(data));
+      }
     }
   }
-
-  // If we can't parse the message in any known format, return the stringified version
-  return { content: JSON.stringify(message, null, 2), tool_usage: tool_usage };
 }
 
 function displayConversation(conversation) {